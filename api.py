@@ -1,14 +1,25 @@
 # api.py
+import asyncio
+import io
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-from evrika.agent import agent_respond
+from evrika.agent import agent_respond, agent_respond_stream
+from evrika.config import (
+    EXECUTOR,
+    bind_chat_session,
+    bind_current_video,
+    get_current_youtube_id,
+    warm_up_clients,
+)
 from evrika.rag_pipeline import (
     ingest_youtube,
     generate_brief_text,
-    save_brief_as_pdf,
+    render_brief_pdf,
+    warm_up_reranker,
 )
 
 app = FastAPI(
@@ -23,9 +34,33 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Youtube-Id", "X-Session-Id"],
 )
 
 
+# Per-request 'current' video (X-Youtube-Id header in and out)
+app.middleware("http")(bind_current_video)
+
+# Per-conversation chat history (X-Session-Id header in and out)
+app.middleware("http")(bind_chat_session)
+
+
+@app.on_event("startup")
+async def _use_shared_executor() -> None:
+    """Run asyncio.to_thread work on the shared evrika thread pool."""
+    asyncio.get_running_loop().set_default_executor(EXECUTOR)
+
+
+@app.on_event("startup")
+async def _warm_up() -> None:
+    """
+    Pre-open OpenAI + Supabase connections and load the reranker, so the
+    first user doesn't pay for them.
+    """
+    await asyncio.to_thread(warm_up_clients)
+    await asyncio.to_thread(warm_up_reranker)
+
+
 # ---------- Schemas ----------
 
 class ChatRequest(BaseModel):
@@ -62,20 +97,49 @@ class BriefPdfRequest(BaseModel):
 
 
 @app.post("/chat", response_model=ChatResponse)
-def chat(req: ChatRequest) -> ChatResponse:
+async def chat(req: ChatRequest) -> ChatResponse:
     """
     General chat endpoint using the Evrika agent.
     """
-    reply = agent_respond(req.message)
+    reply = await asyncio.to_thread(agent_respond, req.message)
     return ChatResponse(reply=reply)
 
 
+def _sse_event(text: str) -> str:
+    """Format text as one Server-Sent Event (multi-line text -> multiple data: lines)."""
+    return "".join(f"data: {line}\n" for line in text.split("\n")) + "\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest) -> StreamingResponse:
+    """
+    Streaming version of /chat using Server-Sent Events.
+
+    Each text delta of the final answer is sent as a `data:` event as soon
+    as the LLM produces it; an `event: done` marks the end of the answer.
+
+    The X-Youtube-Id response header is sent before the answer runs, so a
+    video ingested while answering is reported in an `event: video` (its
+    id as data) right before `done`.
+    """
+    def events():
+        # Sync generator: Starlette iterates it in a worker thread
+        for delta in agent_respond_stream(req.message):
+            yield _sse_event(delta)
+        youtube_id = get_current_youtube_id()
+        if youtube_id:
+            yield f"event: video\ndata: {youtube_id}\n\n"
+        yield "event: done\ndata: \n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
 @app.post("/ingest", response_model=IngestResponse)
-def ingest(req: IngestRequest) -> IngestResponse:
+async def ingest(req: IngestRequest) -> IngestResponse:
     """
     Ingest a YouTube video into Supabase (if not already present).
     """
-    meta = ingest_youtube(req.url)
+    meta = await asyncio.to_thread(ingest_youtube, req.url)
     return IngestResponse(
         title=meta.get("title", ""),
         youtube_id=meta.get("youtube_id", ""),
@@ -84,27 +148,26 @@ def ingest(req: IngestRequest) -> IngestResponse:
 
 
 @app.post("/brief", response_model=BriefResponse)
-def create_brief(req: BriefRequest) -> BriefResponse:
+async def create_brief(req: BriefRequest) -> BriefResponse:
     """
     Step 1: Generate a Markdown Evrika Brief from a YouTube URL/ID.
 
     The frontend should show this text and allow the user to edit it
     before turning it into a PDF.
     """
-    brief_md = generate_brief_text(req.video_hint)
+    brief_md = await asyncio.to_thread(generate_brief_text, req.video_hint)
     return BriefResponse(brief_markdown=brief_md)
 
 
 @app.post("/brief/pdf")
-def create_brief_pdf(req: BriefPdfRequest):
+async def create_brief_pdf(req: BriefPdfRequest):
     """
     Step 2: Take the (possibly edited) Markdown brief from the user
     and return a generated PDF.
     """
-    filename = "evrika_brief.pdf"
-    save_brief_as_pdf(req.brief_markdown, filename)
-    return FileResponse(
-        filename,
+    pdf_bytes = await asyncio.to_thread(render_brief_pdf, req.brief_markdown)
+    return StreamingResponse(
+        io.BytesIO(pdf_bytes),
         media_type="application/pdf",
-        filename=filename,
+        headers={"Content-Disposition": 'attachment; filename="evrika_brief.pdf"'},
     )
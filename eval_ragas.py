@@ -21,9 +21,12 @@ This script:
 - Prints per-sample + average scores
 """
 
-from typing import List, Dict, Any
+import argparse
+import hashlib
+from typing import List, Dict, Any, Optional
 
 from datasets import Dataset
+from diskcache import Cache
 from ragas import evaluate
 from ragas.metrics import (
     faithfulness,
@@ -36,7 +39,8 @@ from ragas.embeddings import LangchainEmbeddingsWrapper
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 
 # Import config to ensure env + clients are initialized
-from evrika import config  # noqa: F401
+from evrika import config, llm_cache, rag_pipeline  # noqa: F401
+from evrika.config import get_embeddings, get_llm, parallel_map
 
 # Import Evrika RAG pieces
 from evrika.rag_pipeline import (
@@ -46,7 +50,13 @@ from evrika.rag_pipeline import (
     _get_all_chunks_for_video,
     _is_metadata_question,
     _is_recommendation_question,
+    QA_PROMPT_TEMPLATE,
+    RECOMMENDATION_SYSTEM_PROMPT,
+    RERANK_MODEL_NAME,
+    RETRIEVAL_CANDIDATES,
+    QA_CONTEXT_CHUNKS,
 )
+from evrika.semantic_cache import embed_question
 
 
 # -------------------------------------------------------------------
@@ -181,7 +191,43 @@ GOLD_EXAMPLES: List[Dict[str, str]] = [
 # 2) HELPER: CALL EVRIKA (ANSWER + CONTEXTS)
 # -------------------------------------------------------------------
 
-def query_evrika(question: str, video_hint: str) -> Dict[str, Any]:
+# Every gold question is answered by the pipeline itself: with the
+# semantic QA cache, a paraphrased question with a different ground truth
+# could get another question's answer, and cached LLM completions would
+# hide changes to the model or prompts. Both are off for evaluation.
+rag_pipeline.QA_SEMANTIC_CACHE_ENABLED = False
+llm_cache.LLM_CACHE_ENABLED = False
+
+# {answer, contexts} per (question, video_hint, pipeline), persisted across
+# runs so re-running the eval only pays for new or edited gold examples.
+# The pipeline part changes with the model, the prompts and the retrieval
+# parameters, so results of an older pipeline are never reused. Use
+# --no-cache to start fresh after other changes to the pipeline code.
+EVAL_CACHE_DIR = "./.eval_cache"
+EVAL_CACHE_EXPIRE_SECONDS = 7 * 86400
+_EVAL_CACHE = Cache(EVAL_CACHE_DIR)
+
+
+def _pipeline_fingerprint() -> str:
+    """Hash of everything besides the question that shapes a QA result."""
+    llm = get_llm()
+    parts = [
+        str(getattr(llm, "model_name", "")),
+        str(getattr(get_embeddings(), "model", "")),
+        QA_PROMPT_TEMPLATE,
+        RECOMMENDATION_SYSTEM_PROMPT,
+        RERANK_MODEL_NAME,
+        str(RETRIEVAL_CANDIDATES),
+        str(QA_CONTEXT_CHUNKS),
+    ]
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+
+def query_evrika(
+    question: str,
+    video_hint: str,
+    question_vector: Optional[List[float]] = None,
+) -> Dict[str, Any]:
     """
     Call Evrika QA and retrieve the contexts used by RAG.
 
@@ -192,6 +238,9 @@ def query_evrika(question: str, video_hint: str) -> Dict[str, Any]:
 
     For metadata / recommendation questions, retrieval is less meaningful,
     but we still try _match_documents so Ragas can compute something.
+
+    question_vector: optional precomputed embedding of `question`; it is
+    reused for the QA call and retrieval.
     """
     # 1) Compute youtube_id if possible
     youtube_id = None
@@ -201,15 +250,26 @@ def query_evrika(question: str, video_hint: str) -> Dict[str, Any]:
         except Exception as e:
             print(f"[EVAL] Failed to parse video_hint '{video_hint}': {e}")
 
+    if question_vector is None:
+        question_vector = embed_question(question)
+
     # 2) Get system answer (this uses your full _run_qa logic)
-    answer = answer_question_text(question, video_hint=video_hint)
+    answer = answer_question_text(
+        question, video_hint=video_hint, query_embedding=question_vector
+    )
 
     # 3) Retrieve contexts (chunks) in a similar way to _run_qa
     docs: List[Dict[str, Any]] = []
     try:
         # Only skip retrieval if we really wanted to; but for evaluation it's
         # actually fine to always try _match_documents, so we can see retrieval quality.
-        docs = _match_documents(question, youtube_id=youtube_id, match_count=6)
+        docs = _match_documents(
+            question,
+            youtube_id=youtube_id,
+            match_count=RETRIEVAL_CANDIDATES,
+            query_embedding=question_vector,
+            rerank_top_k=QA_CONTEXT_CHUNKS,
+        )
 
         if (not docs) and youtube_id:
             print(
@@ -240,23 +300,52 @@ def query_evrika(question: str, video_hint: str) -> Dict[str, Any]:
 # 3) BUILD RAGAS DATASET
 # -------------------------------------------------------------------
 
+# Each example is one OpenAI QA call + one retrieval; run them concurrently
+# on the shared evrika executor (its size caps in-flight OpenAI requests).
+
+
+def _evaluate_example(ex: Dict[str, str], question_vector: List[float]) -> Dict[str, Any]:
+    print(f"→ Evaluating question: {ex['question']}")
+    return query_evrika(ex["question"], ex["video_hint"], question_vector)
+
+
 def build_ragas_dataset(gold_examples: List[Dict[str, str]]) -> Dataset:
     questions: List[str] = []
     answers: List[str] = []
     gts: List[str] = []
     contexts_per_sample: List[List[str]] = []
 
-    for ex in gold_examples:
-        q = ex["question"]
-        vh = ex["video_hint"]
-        gt = ex["ground_truth"]
+    # Results from previous runs (same question + video_hint + pipeline)
+    pipeline = _pipeline_fingerprint()
+    qa_results: List[Optional[Dict[str, Any]]] = [
+        _EVAL_CACHE.get((ex["question"], ex["video_hint"], pipeline))
+        for ex in gold_examples
+    ]
+    todo = [i for i, result in enumerate(qa_results) if result is None]
+    print(f"[EVAL] {len(gold_examples) - len(todo)} cached, {len(todo)} to evaluate.")
 
-        print(f"→ Evaluating question: {q}")
-        qa_result = query_evrika(q, vh)
+    if todo:
+        todo_examples = [gold_examples[i] for i in todo]
 
-        questions.append(q)
+        # Embed every question in one batched request instead of one per example
+        question_vectors = get_embeddings().embed_documents(
+            [ex["question"] for ex in todo_examples]
+        )
+
+        # parallel_map keeps results in the same order as todo_examples
+        fresh = parallel_map(_evaluate_example, todo_examples, question_vectors)
+        for i, ex, qa_result in zip(todo, todo_examples, fresh):
+            qa_results[i] = qa_result
+            _EVAL_CACHE.set(
+                (ex["question"], ex["video_hint"], pipeline),
+                qa_result,
+                expire=EVAL_CACHE_EXPIRE_SECONDS,
+            )
+
+    for ex, qa_result in zip(gold_examples, qa_results):
+        questions.append(ex["question"])
         answers.append(qa_result["answer"])
-        gts.append(gt)
+        gts.append(ex["ground_truth"])
         contexts_per_sample.append(qa_result["contexts"])
 
     dataset = Dataset.from_dict(
@@ -326,6 +415,18 @@ def run_ragas_eval(dataset: Dataset):
 # -------------------------------------------------------------------
 
 def main():
+    parser = argparse.ArgumentParser(description="Evaluate Evrika RAG with Ragas.")
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=f"Clear {EVAL_CACHE_DIR} and re-run every gold question.",
+    )
+    args = parser.parse_args()
+
+    if args.no_cache:
+        _EVAL_CACHE.clear()
+        print(f"[EVAL] Cleared {EVAL_CACHE_DIR}")
+
     if not GOLD_EXAMPLES:
         print("No GOLD_EXAMPLES defined. Please fill the GOLD_EXAMPLES list first.")
         return
@@ -3,12 +3,22 @@
 Simple LangChain tool-calling agent for Evrika Briefs.
 """
 
-import json
-from typing import Any, Dict, List
-
-from langchain_core.messages import HumanMessage, ToolMessage, SystemMessage
-
-from .config import llm, CHAT_HISTORY
+import functools
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+import orjson
+from cachetools import TTLCache
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage, SystemMessage
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.tools import tool
+
+from . import config
+from .config import get_llm, get_chat_history, parallel_map
 from .rag_pipeline import (
     fetch_video,
     semantic_search,
@@ -17,23 +27,46 @@ from .rag_pipeline import (
     recommendations,
     save_brief_as_pdf,
 )
-from .metadata_tool import video_metadata_tool
+from .metadata_tool import video_metadata_tool, video_metadata_batch_tool
+from .semantic_cache import SemanticCache, embed_question
 
 
 # -------- Tools --------
 
+
+@tool("save_brief_as_pdf")
+def save_brief_pdf_tool(brief_text: str) -> str:
+    """
+    Save a brief as a PDF file and return its path.
+    """
+    # The model only supplies the text; every call gets its own temp file,
+    # so a prompt can't choose (or overwrite) a path on the server.
+    fd, path = tempfile.mkstemp(prefix="evrika_brief_", suffix=".pdf")
+    os.close(fd)
+    result = save_brief_as_pdf(brief_text, filename=path)
+    if result != path:
+        # reportlab missing: nothing was written
+        os.remove(path)
+    return result
+
+
 TOOLS = [
     fetch_video,
     semantic_search,
     video_chat,
     generate_brief,
     recommendations,
-    save_brief_as_pdf,
+    save_brief_pdf_tool,
     video_metadata_tool,  # metadata tool is available to the LLM
+    video_metadata_batch_tool,
 ]
 TOOLS_BY_NAME: Dict[str, Any] = {t.name: t for t in TOOLS}
 
-llm_with_tools = llm.bind_tools(TOOLS)
+
+@functools.cache
+def get_llm_with_tools() -> Any:
+    """The shared LLM with TOOLS bound (built on first use)."""
+    return get_llm().bind_tools(TOOLS)
 
 
 # -------- System Prompt --------
@@ -65,6 +98,8 @@ TOOLS YOU CAN USE
 - video_metadata:
     Get structured METADATA for a video from Supabase, including:
     title, speaker, channel, duration, publish date, and URL.
+- video_metadata_batch:
+    Same METADATA for several videos in one call (e.g. to compare them).
 
 GUIDELINES
 
@@ -72,45 +107,131 @@ GUIDELINES
   (concepts, explanations, insights, quotes, etc.).
 - Use `video_metadata` for questions about metadata
   (title, speaker, channel, duration, publish date, URL).
+  When the question involves more than one video, call
+  `video_metadata_batch` once with all of them instead of repeating `video_metadata`.
 - If a tool returns JSON, read it carefully and answer based on it.
 - Keep answers concise and helpful.
 """.strip()
 
+# Built once and reused for every turn. The system prompt is passed as a
+# message object (not a template string), so it is never re-formatted and
+# stays byte-identical across requests; together with the fixed tool
+# schemas that keeps the request prefix stable for OpenAI prompt caching.
+AGENT_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        SystemMessage(content=SYSTEM_PROMPT),
+        MessagesPlaceholder("history"),
+        ("human", "{input}"),
+    ]
+)
+
 
 # -------- Limits to avoid context blowups --------
 
-MAX_HISTORY_MESSAGES = 12          # number of previous messages to keep
 MAX_TOOL_OUTPUT_CHARS = 40_000     # hard cap for any single tool output
 
 
+# -------- Answer cache (exact match on the normalized user input) --------
+
+ANSWER_CACHE_SIZE = 512
+ANSWER_CACHE_TTL_SECONDS = 3600
+
+# Turns that called these tools have side effects (ingestion, files on disk),
+# so replaying the final answer from cache would skip work the user expects.
+_UNCACHEABLE_TOOLS = {"fetch_video", "save_brief_as_pdf"}
+
+_ANSWER_CACHE: TTLCache = TTLCache(
+    maxsize=ANSWER_CACHE_SIZE, ttl=ANSWER_CACHE_TTL_SECONDS
+)
+_ANSWER_CACHE_LOCK = threading.Lock()
+
+# Paraphrases of earlier questions (same video, same conversation so far)
+# are served from here. Looking one up costs an embedding request on every
+# exact-cache miss, which nothing else in the agent turn reuses, so it is
+# off unless EVRIKA_AGENT_SEMANTIC_CACHE=1.
+AGENT_SEMANTIC_CACHE_ENABLED = os.getenv("EVRIKA_AGENT_SEMANTIC_CACHE", "0") == "1"
+_SEMANTIC_CACHE = SemanticCache()
+
+# (current video, chat history digest, normalized input)
+AnswerCacheKey = Tuple[Optional[str], str, str]
+
+
+def _normalize_input(text: str) -> str:
+    """Lowercase and collapse whitespace so trivial variations share a cache entry."""
+    return re.sub(r"\s+", " ", text.strip().lower())
+
+
+def _history_digest() -> str:
+    """Digest of this session's chat history ("" for a fresh conversation)."""
+    history = list(get_chat_history())
+    if not history:
+        return ""
+    h = hashlib.sha256()
+    for message in history:
+        h.update(f"{message.type}\x01{message.content}\x00".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _answer_cache_key(user_input: str) -> AnswerCacheKey:
+    """
+    Exact-match cache key for a user message.
+
+    The current video is part of the key: "who is the speaker?" has a
+    different answer for every video. So is the conversation so far:
+    follow-ups like "explain more" only mean something in their context.
+    """
+    return (
+        config.get_current_youtube_id(),
+        _history_digest(),
+        _normalize_input(user_input),
+    )
+
+
+def _remember_exchange(user_input: str, ai_msg: AIMessage) -> None:
+    """
+    Persist the latest exchange (without the system message) in the
+    session's chat history.
+
+    The history is a bounded deque, so old messages are evicted automatically.
+    """
+    get_chat_history().extend([HumanMessage(user_input), ai_msg])
+
+
 def _sanitize_tool_output(tool_name: str, tool_output: Any) -> str:
     """
     Convert tool_output to a reasonably sized string before adding it
     as a ToolMessage.
 
-    - Coerces non-strings to string.
-    - If it's JSON, drop obviously huge keys like 'raw_meta' / 'raw_metadata'.
+    - Serializes dict / list outputs (e.g. the metadata tools) as compact JSON,
+      coerces other non-strings to string.
+    - If it looks like JSON, drop obviously huge keys like 'raw_meta' / 'raw_metadata'.
     - Hard-caps the final length to MAX_TOOL_OUTPUT_CHARS.
     """
-    if not isinstance(tool_output, str):
+    if isinstance(tool_output, (dict, list)):
+        tool_output = orjson.dumps(
+            tool_output, option=orjson.OPT_NON_STR_KEYS, default=str
+        ).decode("utf-8")
+    elif not isinstance(tool_output, str):
         tool_output = str(tool_output)
 
     # Fast path if already small
     if len(tool_output) <= MAX_TOOL_OUTPUT_CHARS:
         return tool_output
 
-    # Try JSON cleanup first (useful for metadata)
-    try:
-        data = json.loads(tool_output)
-        if isinstance(data, dict):
-            if "raw_meta" in data:
-                data["raw_meta"] = "[omitted: raw_meta too large]"
-            if "raw_metadata" in data:
-                data["raw_metadata"] = "[omitted: raw_metadata too large]"
-        tool_output = json.dumps(data)
-    except Exception:
-        # Not JSON or parse failed; we'll just truncate below
-        pass
+    # Try JSON cleanup first (useful for metadata). Plain-text outputs
+    # (transcripts, briefs) can't be JSON, so skip the parse attempt for them.
+    if tool_output.lstrip()[:1] in ("{", "["):
+        try:
+            data = orjson.loads(tool_output)
+            if isinstance(data, dict):
+                if "raw_meta" in data:
+                    data["raw_meta"] = "[omitted: raw_meta too large]"
+                if "raw_metadata" in data:
+                    data["raw_metadata"] = "[omitted: raw_metadata too large]"
+            tool_output = orjson.dumps(data).decode("utf-8")
+        except orjson.JSONDecodeError:
+            # Parse failed; we'll just truncate below
+            pass
 
     # Hard cap to avoid context_length_exceeded
     if len(tool_output) > MAX_TOOL_OUTPUT_CHARS:
@@ -121,6 +242,91 @@ def _sanitize_tool_output(tool_name: str, tool_output: Any) -> str:
 
 # -------- Main agent loop --------
 
+def _lookup_cached_answer(
+    user_input: str,
+) -> Tuple[Optional[str], AnswerCacheKey, Optional[List[float]]]:
+    """
+    Check the exact-match cache, then the semantic cache.
+
+    Returns (cached_answer_or_None, exact_cache_key, question_vector).
+    The question vector is None on an exact hit (no embedding needed) and
+    when the semantic cache is disabled.
+    """
+    cache_key = _answer_cache_key(user_input)
+    with _ANSWER_CACHE_LOCK:
+        cached_answer = _ANSWER_CACHE.get(cache_key)
+    if cached_answer is not None:
+        print("[AGENT] Answer cache hit.")
+        return cached_answer, cache_key, None
+    if not AGENT_SEMANTIC_CACHE_ENABLED:
+        return None, cache_key, None
+
+    question_vector = embed_question(user_input)
+    cached_answer = _SEMANTIC_CACHE.lookup(question_vector, scope=cache_key[:2])
+    if cached_answer is not None:
+        print("[AGENT] Semantic cache hit.")
+    return cached_answer, cache_key, question_vector
+
+
+def _store_answer(
+    cache_key: AnswerCacheKey,
+    question_vector: Optional[List[float]],
+    answer: str,
+    used_tools: Set[str],
+) -> None:
+    if used_tools & _UNCACHEABLE_TOOLS:
+        return
+    with _ANSWER_CACHE_LOCK:
+        _ANSWER_CACHE[cache_key] = answer
+    if question_vector is not None:
+        _SEMANTIC_CACHE.add(question_vector, answer, scope=cache_key[:2])
+
+
+def _build_messages(user_input: str) -> List:
+    # The history already holds at most MAX_HISTORY_MESSAGES messages
+    return AGENT_PROMPT.format_messages(
+        history=list(get_chat_history()),
+        input=user_input,
+    )
+
+
+def _invoke_tool(tool_call: Dict[str, Any]) -> str:
+    """Run a single tool call and return its sanitized output."""
+    tool_name = tool_call["name"]
+    tool_obj = TOOLS_BY_NAME.get(tool_name)
+    if tool_obj is None:
+        raw_output = f"Error: unknown tool '{tool_name}'."
+    else:
+        raw_output = tool_obj.invoke(tool_call["args"])
+
+    return _sanitize_tool_output(tool_name, raw_output)
+
+
+def _execute_tool_calls(ai_msg: Any, messages: List, used_tools: Set[str]) -> None:
+    """
+    Execute each requested tool and feed results back to the model.
+
+    When the LLM requests several tools in one turn (e.g. fetch_video +
+    video_metadata), they are I/O-bound and independent, so they run
+    concurrently. ToolMessages are appended in the original call order.
+    """
+    tool_calls = ai_msg.tool_calls
+    used_tools.update(tool_call["name"] for tool_call in tool_calls)
+
+    if len(tool_calls) == 1:
+        outputs = [_invoke_tool(tool_calls[0])]
+    else:
+        outputs = parallel_map(_invoke_tool, tool_calls)
+
+    for tool_call, safe_output in zip(tool_calls, outputs):
+        messages.append(
+            ToolMessage(
+                content=safe_output,
+                tool_call_id=tool_call["id"],
+            )
+        )
+
+
 def agent_respond(user_input: str) -> str:
     """
     Simple LangChain-based tool-calling loop.
@@ -128,49 +334,69 @@ def agent_respond(user_input: str) -> str:
     The LLM sees the system prompt and the available tools, decides
     which tools to call (if any), and we execute them in a loop until
     the LLM returns a normal message with no tool calls.
+
+    Final answers are cached per (current video, chat history, normalized
+    input), so an exact repeat skips the whole LLM + tool loop. With
+    EVRIKA_AGENT_SEMANTIC_CACHE=1, near-duplicate questions are also matched
+    by embedding similarity in a second, semantic cache.
     """
-    # Only include the last N messages from history to keep context small
-    history = CHAT_HISTORY[-MAX_HISTORY_MESSAGES:]
+    cached_answer, cache_key, question_vector = _lookup_cached_answer(user_input)
+    if cached_answer is not None:
+        _remember_exchange(user_input, AIMessage(cached_answer))
+        return cached_answer
 
-    messages: List = [SystemMessage(content=SYSTEM_PROMPT)] + history + [
-        HumanMessage(user_input)
-    ]
+    used_tools: Set[str] = set()
+    messages = _build_messages(user_input)
 
     while True:
-        ai_msg = llm_with_tools.invoke(messages)
+        ai_msg = get_llm_with_tools().invoke(messages)
         messages.append(ai_msg)
 
         # No tool calls -> final answer
         if not getattr(ai_msg, "tool_calls", None):
-            # Persist the latest exchange (without the system message)
-            CHAT_HISTORY.extend([HumanMessage(user_input), ai_msg])
+            _remember_exchange(user_input, ai_msg)
+            _store_answer(cache_key, question_vector, ai_msg.content, used_tools)
+            return ai_msg.content
 
-            # Keep global history bounded as well
-            if len(CHAT_HISTORY) > MAX_HISTORY_MESSAGES:
-                CHAT_HISTORY[:] = CHAT_HISTORY[-MAX_HISTORY_MESSAGES:]
+        _execute_tool_calls(ai_msg, messages, used_tools)
 
-            return ai_msg.content
 
-        # Execute each requested tool and feed results back to the model
-        for tool_call in ai_msg.tool_calls:
-            tool_name = tool_call["name"]
-            tool_args = tool_call["args"]
-            call_id = tool_call["id"]
-
-            tool_obj = TOOLS_BY_NAME.get(tool_name)
-            if tool_obj is None:
-                raw_output = f"Error: unknown tool '{tool_name}'."
-            else:
-                raw_output = tool_obj.invoke(tool_args)
-
-            safe_output = _sanitize_tool_output(tool_name, raw_output)
-
-            messages.append(
-                ToolMessage(
-                    content=safe_output,
-                    tool_call_id=call_id,
-                )
-            )
+def agent_respond_stream(user_input: str) -> Iterator[str]:
+    """
+    Streaming variant of agent_respond: yields text deltas as they arrive.
+
+    Tool-calling turns are executed exactly as in agent_respond (OpenAI
+    sends no text for them), so in practice only the final answer is
+    streamed. The assembled answer is stored in the chat history and the
+    answer caches once the stream completes.
+    """
+    cached_answer, cache_key, question_vector = _lookup_cached_answer(user_input)
+    if cached_answer is not None:
+        _remember_exchange(user_input, AIMessage(cached_answer))
+        yield cached_answer
+        return
+
+    used_tools: Set[str] = set()
+    messages = _build_messages(user_input)
+
+    while True:
+        ai_msg = None
+        for chunk in get_llm_with_tools().stream(messages):
+            ai_msg = chunk if ai_msg is None else ai_msg + chunk
+            if chunk.content:
+                yield chunk.content
+
+        if ai_msg is None:
+            return
+        messages.append(ai_msg)
+
+        # No tool calls -> the streamed text was the final answer
+        if not ai_msg.tool_calls:
+            _remember_exchange(user_input, AIMessage(content=ai_msg.content))
+            _store_answer(cache_key, question_vector, ai_msg.content, used_tools)
+            return
+
+        _execute_tool_calls(ai_msg, messages, used_tools)
 
 
 if __name__ == "__main__":
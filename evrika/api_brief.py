@@ -1,10 +1,14 @@
 # api_brief.py
+import asyncio
+import io
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-from evrika.rag_pipeline import generate_brief_text, save_brief_as_pdf
+from evrika.config import EXECUTOR, bind_current_video, warm_up_clients
+from evrika.rag_pipeline import generate_brief_text, render_brief_pdf
 
 
 app = FastAPI(
@@ -19,8 +23,24 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Youtube-Id"],
 )
 
+# Per-request 'current' video (X-Youtube-Id header in and out)
+app.middleware("http")(bind_current_video)
+
+
+@app.on_event("startup")
+async def _use_shared_executor() -> None:
+    """Run asyncio.to_thread work on the shared evrika thread pool."""
+    asyncio.get_running_loop().set_default_executor(EXECUTOR)
+
+
+@app.on_event("startup")
+async def _warm_up() -> None:
+    """Pre-open OpenAI + Supabase connections so the first user doesn't pay for them."""
+    await asyncio.to_thread(warm_up_clients)
+
 
 class BriefRequest(BaseModel):
     video_hint: str  # YouTube URL or ID
@@ -35,24 +55,23 @@ class BriefPdfRequest(BaseModel):
 
 
 @app.post("/brief", response_model=BriefResponse)
-def create_brief(req: BriefRequest) -> BriefResponse:
+async def create_brief(req: BriefRequest) -> BriefResponse:
     """
     Step 1: Generate a Markdown Evrika Brief from a YouTube URL/ID.
     """
-    brief_md = generate_brief_text(req.video_hint)
+    brief_md = await asyncio.to_thread(generate_brief_text, req.video_hint)
     return BriefResponse(brief_markdown=brief_md)
 
 
 @app.post("/brief/pdf")
-def create_brief_pdf(req: BriefPdfRequest):
+async def create_brief_pdf(req: BriefPdfRequest):
     """
     Step 2: Take the (possibly edited) Markdown brief from the user
     and return a generated PDF.
     """
-    filename = "evrika_brief.pdf"
-    save_brief_as_pdf(req.brief_markdown, filename)
-    return FileResponse(
-        filename,
+    pdf_bytes = await asyncio.to_thread(render_brief_pdf, req.brief_markdown)
+    return StreamingResponse(
+        io.BytesIO(pdf_bytes),
         media_type="application/pdf",
-        filename=filename,
+        headers={"Content-Disposition": 'attachment; filename="evrika_brief.pdf"'},
     )
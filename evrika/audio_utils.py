@@ -5,12 +5,61 @@ Audio utilities for Evrika Briefs:
 - TTS: synthesize_answer_tts -> short spoken answer as audio bytes.
 """
 
+import functools
+import hashlib
 import io
-from typing import Tuple
+import os
+import threading
+from typing import Optional, Tuple
 
+from cachetools import LRUCache
+from diskcache import Cache
 from pydub import AudioSegment
 
-from .config import openai_client
+from .config import get_openai_client
+
+
+# Containers Whisper accepts as-is. m4a/mp4 is deliberately missing: some
+# browser m4a encodings are rejected with "Invalid file format", so those
+# still go through the pydub/ffmpeg re-encode below.
+_WHISPER_NATIVE_FORMATS = {"wav", "webm", "ogg", "mp3", "flac"}
+
+
+def _sniff_audio_format(audio_bytes: bytes) -> Optional[str]:
+    """Guess the audio container from its magic bytes (None if unknown)."""
+    header = audio_bytes[:12]
+    if header[:4] == b"RIFF" and header[8:12] == b"WAVE":
+        return "wav"
+    if header[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"
+    if header[:4] == b"OggS":
+        return "ogg"
+    if header[:4] == b"fLaC":
+        return "flac"
+    if header[:3] == b"ID3":
+        return "mp3"
+    if len(header) > 1 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0:
+        # Frame sync. The layer bits tell MPEG Layer III (mp3) apart from
+        # AAC ADTS, whose layer is always 00.
+        version = (header[1] >> 3) & 0x03
+        layer = (header[1] >> 1) & 0x03
+        if layer == 0 and header[1] & 0xF0 == 0xF0:
+            return "aac"
+        if layer == 1 and version != 1:  # version 01 is reserved
+            return "mp3"
+        return None
+    if header[4:8] == b"ftyp":
+        return "m4a"
+    return None
+
+
+def _whisper_transcribe(buffer: io.BytesIO, model: str) -> str:
+    transcript = get_openai_client().audio.transcriptions.create(
+        model=model,
+        file=buffer,
+    )
+    text = getattr(transcript, "text", "") or ""
+    return text.strip()
 
 
 def transcribe_question_bytes(
@@ -20,13 +69,26 @@ def transcribe_question_bytes(
     """
     Transcribe a short audio snippet (user question) using OpenAI Whisper.
 
-    We accept whatever the browser records (e.g. m4a), decode it with pydub/ffmpeg,
-    convert it to WAV in memory, and then send the WAV to Whisper.
+    If the browser already sends a format Whisper accepts (wav, webm, ogg,
+    mp3, flac), the bytes are forwarded as-is. Anything else (e.g. m4a)
+    is decoded with pydub/ffmpeg, converted to WAV in memory, and then
+    sent to Whisper.
 
-    This avoids "Invalid file format" errors for tricky m4a encodings.
+    This avoids "Invalid file format" errors for tricky m4a encodings
+    without paying an ffmpeg round-trip for every request.
     """
     print(f"[VOICE] transcribe_question_bytes: received {len(audio_bytes)} bytes")
 
+    # 0) Fast path: Whisper can read the container directly
+    audio_format = _sniff_audio_format(audio_bytes)
+    if audio_format in _WHISPER_NATIVE_FORMATS:
+        direct_buffer = io.BytesIO(audio_bytes)
+        direct_buffer.name = f"voice.{audio_format}"
+        try:
+            return _whisper_transcribe(direct_buffer, model)
+        except Exception as e:
+            print(f"[VOICE] Direct {audio_format} upload failed ({e}); re-encoding to WAV.")
+
     # 1) Decode the incoming audio (m4a, webm, etc.) with pydub
     try:
         input_buffer = io.BytesIO(audio_bytes)
@@ -46,12 +108,29 @@ def transcribe_question_bytes(
     wav_buffer.name = "voice.wav"
 
     # 3) Send WAV to Whisper
-    transcript = openai_client.audio.transcriptions.create(
-        model=model,
-        file=wav_buffer,
-    )
-    text = getattr(transcript, "text", "") or ""
-    return text.strip()
+    return _whisper_transcribe(wav_buffer, model)
+
+
+# -------- TTS cache --------
+
+# Canned phrases (greetings, "Sorry, I couldn't find that video", errors)
+# repeat constantly; synthesize them once. The in-memory LRU serves hot
+# phrases, the disk cache keeps them across restarts.
+TTS_CACHE_SIZE = 256
+TTS_CACHE_DIR = os.environ.get("TTS_CACHE_DIR", "./.tts_cache")
+TTS_CACHE_SIZE_LIMIT = 200_000_000  # bytes on disk
+
+_TTS_CACHE: LRUCache = LRUCache(maxsize=TTS_CACHE_SIZE)
+_TTS_CACHE_LOCK = threading.Lock()
+
+
+@functools.cache
+def _get_tts_disk_cache() -> Cache:
+    return Cache(TTS_CACHE_DIR, size_limit=TTS_CACHE_SIZE_LIMIT)
+
+
+def _tts_cache_key(text: str, model: str, voice: str) -> bytes:
+    return hashlib.sha256(f"{model}|{voice}|{text}".encode("utf-8")).digest()
 
 
 def synthesize_answer_tts(
@@ -69,8 +148,23 @@ def synthesize_answer_tts(
         # Return empty audio if there's nothing to say
         return b"", "audio/mpeg"
 
+    key = _tts_cache_key(text, model, voice)
+    with _TTS_CACHE_LOCK:
+        cached = _TTS_CACHE.get(key)
+    if cached is None:
+        try:
+            cached = _get_tts_disk_cache().get(key)
+        except Exception as e:
+            print(f"[VOICE] Warning: failed to read TTS disk cache: {e}")
+        if cached is not None:
+            with _TTS_CACHE_LOCK:
+                _TTS_CACHE[key] = cached
+    if cached is not None:
+        print("[VOICE] TTS cache hit.")
+        return cached, "audio/mpeg"
+
     # Call OpenAI TTS
-    speech = openai_client.audio.speech.create(
+    speech = get_openai_client().audio.speech.create(
         model=model,
         voice=voice,
         input=text,
@@ -80,4 +174,11 @@ def synthesize_answer_tts(
     # If your version differs, you can adapt this to speech.content instead.
     audio_bytes = speech.read()
 
+    with _TTS_CACHE_LOCK:
+        _TTS_CACHE[key] = audio_bytes
+    try:
+        _get_tts_disk_cache().set(key, audio_bytes)
+    except Exception as e:
+        print(f"[VOICE] Warning: failed to write TTS disk cache: {e}")
+
     return audio_bytes, "audio/mpeg"
@@ -3,19 +3,34 @@
 Shared configuration and global clients for Evrika Briefs.
 """
 
+import asyncio
+import functools
 import os
-from typing import List, Optional
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar, copy_context
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, TypeVar
+from uuid import uuid4
 
+import httpx
+from cachetools import LRUCache, TTLCache
 from dotenv import load_dotenv, find_dotenv
-from supabase import create_client, Client
+from supabase import create_client, Client, ClientOptions
 from openai import OpenAI
 
+from langchain_core.embeddings import Embeddings
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_core.messages import HumanMessage
+from langchain_core.messages import BaseMessage
 
-# Load environment variables from .env if present
-load_dotenv(find_dotenv())
+from . import embedding_cache
+
+# Load environment variables from .env if present. EVRIKA_DOTENV points at
+# a specific file and skips the directory walk in find_dotenv().
+DOTENV_PATH = os.environ.get("EVRIKA_DOTENV") or find_dotenv()
+load_dotenv(DOTENV_PATH)
 
 
 def get_env(name: str) -> str:
@@ -29,34 +44,357 @@ def get_env(name: str) -> str:
     return value
 
 
-SUPABASE_URL = get_env("SUPABASE_URL")
-SUPABASE_SERVICE_KEY = get_env("SUPABASE_SERVICE_KEY")
-OPENAI_API_KEY = get_env("OPENAI_API_KEY")
+# -------- Shared clients (created lazily, once per process) --------
+
+# Every client is built on first use by a cached factory, so importing
+# evrika modules stays cheap and tests can monkeypatch a factory (or call
+# its cache_clear()) before anything touches the network.
+
+
+# Embeddings, chat, Whisper and TTS are many small requests to one host;
+# HTTP/2 multiplexes them over a few long-lived connections instead of
+# paying TLS setup per HTTP/1.1 connection. (Requires the h2 package.)
+HTTP_TIMEOUT_SECONDS = 60
+_HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+
+# Supabase (PostgREST) gets its own keep-alive HTTP/2 pool, shared by
+# every .execute() in the process.
+_SUPABASE_HTTP_LIMITS = httpx.Limits(
+    max_connections=40, max_keepalive_connections=20, keepalive_expiry=60
+)
+
+
+@functools.cache
+def get_supabase() -> Client:
+    http = httpx.Client(
+        http2=True, timeout=HTTP_TIMEOUT_SECONDS, limits=_SUPABASE_HTTP_LIMITS
+    )
+    return create_client(
+        get_env("SUPABASE_URL"),
+        get_env("SUPABASE_SERVICE_KEY"),
+        options=ClientOptions(httpx_client=http),
+    )
+
+
+@functools.cache
+def get_http_client() -> httpx.Client:
+    return httpx.Client(
+        http2=True, timeout=HTTP_TIMEOUT_SECONDS, limits=_HTTP_LIMITS
+    )
+
+
+@functools.cache
+def get_http_async_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=True, timeout=HTTP_TIMEOUT_SECONDS, limits=_HTTP_LIMITS
+    )
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
 
-embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+@functools.cache
+def get_openai_client() -> OpenAI:
+    return OpenAI(api_key=get_env("OPENAI_API_KEY"), http_client=get_http_client())
 
-llm = ChatOpenAI(
-    model="gpt-4o-mini",
-    temperature=0.0,
+
+# -------- Shared thread pool --------
+
+# One pool for the whole process: parallel tool calls, eval fan-out and
+# asyncio.to_thread (the API apps install it as the loop's default executor).
+EXECUTOR = ThreadPoolExecutor(
+    max_workers=min(32, (os.cpu_count() or 4) * 4),
+    thread_name_prefix="evrika",
 )
 
+_T = TypeVar("_T")
+
+
+def parallel_map(fn: Callable[..., _T], *iterables: Iterable[Any]) -> List[_T]:
+    """
+    Like list(EXECUTOR.map(fn, *iterables)), but safe to call from inside
+    an EXECUTOR worker.
+
+    Tasks that no worker has picked up yet (e.g. the pool is saturated by
+    callers waiting on their own sub-tasks) are cancelled and run inline
+    on the calling thread, so nested fan-outs can't deadlock the pool.
+
+    Each task runs in a copy of the caller's context, so the request's
+    CURRENT_YOUTUBE_ID is visible to the workers.
+    """
+    arg_tuples = list(zip(*iterables))
+    futures = [
+        EXECUTOR.submit(copy_context().run, fn, *args) for args in arg_tuples
+    ]
+
+    results: List[_T] = []
+    for fut, args in zip(futures, arg_tuples):
+        if fut.cancel():
+            results.append(fn(*args))
+        else:
+            results.append(fut.result())
+    return results
+
+
+def run_sync(coro: Awaitable[_T]) -> _T:
+    """
+    Run a coroutine to completion from synchronous code.
+
+    Uses asyncio.run() directly, or on an EXECUTOR worker when the calling
+    thread already runs an event loop (asyncio.run() can't nest).
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    return EXECUTOR.submit(copy_context().run, asyncio.run, coro).result()
+
+
+# -------- Embeddings (with an in-process cache) --------
+
+EMBEDDING_CACHE_SIZE = 10_000
+
+# Texts per embeddings API request. Misses beyond one batch are sent as
+# several requests in parallel instead of one long sequential call.
+EMBEDDING_BATCH_SIZE = 96
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Two-level cache in front of an Embeddings model, keyed by content hash.
+
+    An in-process LRU sits on top of the persistent SQLite cache in
+    evrika.embedding_cache, so repeated questions and re-ingested chunks
+    reuse stored vectors (also across restarts) instead of calling the
+    OpenAI API again. Cache misses from one embed_documents() call are
+    sent to the model in EMBEDDING_BATCH_SIZE batches, concurrently.
+    """
+
+    def __init__(self, inner: Embeddings, maxsize: int = EMBEDDING_CACHE_SIZE) -> None:
+        self._inner = inner
+        self._model = str(getattr(inner, "model", ""))
+        self._cache: LRUCache = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        # Expose attributes of the wrapped model (e.g. .model)
+        return getattr(self.__dict__["_inner"], name)
+
+    def _key(self, text: str) -> str:
+        return embedding_cache.content_key(text, self._model)
+
+    def _embed_in_batches(self, texts: List[str]) -> List[List[float]]:
+        if len(texts) <= EMBEDDING_BATCH_SIZE:
+            return self._inner.embed_documents(texts)
+        batches = [
+            texts[i : i + EMBEDDING_BATCH_SIZE]
+            for i in range(0, len(texts), EMBEDDING_BATCH_SIZE)
+        ]
+        return [
+            vector
+            for vectors in parallel_map(self._inner.embed_documents, batches)
+            for vector in vectors
+        ]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        with self._lock:
+            vector = self._cache.get(key)
+        if vector is None:
+            vector = embedding_cache.get_or_compute(
+                [text], lambda texts: [self._inner.embed_query(texts[0])], self._model
+            )[0]
+            with self._lock:
+                self._cache[key] = vector
+        return vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text) for text in texts]
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            for key in keys:
+                vector = self._cache.get(key)
+                if vector is not None:
+                    found[key] = vector
+
+        # Deduplicate misses so repeated texts are only embedded once
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+
+        if missing:
+            vectors = embedding_cache.get_or_compute(
+                list(missing.values()), self._embed_in_batches, self._model
+            )
+            with self._lock:
+                for key, vector in zip(missing, vectors):
+                    self._cache[key] = vector
+                    found[key] = vector
+
+        return [found[key] for key in keys]
+
+
+@functools.cache
+def get_embeddings() -> CachedEmbeddings:
+    return CachedEmbeddings(
+        OpenAIEmbeddings(
+            model="text-embedding-3-small",
+            api_key=get_env("OPENAI_API_KEY"),
+            http_client=get_http_client(),
+            http_async_client=get_http_async_client(),
+        )
+    )
+
+
+@functools.cache
+def get_splitter() -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+
+
+@functools.cache
+def get_llm() -> ChatOpenAI:
+    return ChatOpenAI(
+        model="gpt-4o-mini",
+        temperature=0.0,
+        api_key=get_env("OPENAI_API_KEY"),
+        http_client=get_http_client(),
+        http_async_client=get_http_async_client(),
+    )
+
+
+def warm_up_clients() -> None:
+    """
+    Open the OpenAI and Supabase connections ahead of the first request.
+
+    Issues one tiny embedding and one single-row select, so the TLS + DNS
+    setup (and client construction) is paid at startup; the pooled
+    keep-alive connections are then reused by real traffic. Failures are
+    only logged - the API still starts.
+    """
+    started = time.perf_counter()
+    try:
+        get_embeddings().embed_query("ping")
+        get_supabase().table("documents").select("id").limit(1).execute()
+    except Exception as e:
+        print(f"[WARMUP] Failed: {e}")
+        return
+    print(f"[WARMUP] Clients ready in {time.perf_counter() - started:.2f}s")
+
+
 # -------- Chat history (simple memory) --------
-CHAT_HISTORY: List[HumanMessage] = []
+MAX_HISTORY_MESSAGES = 12  # number of previous messages to keep
+
+# API conversations are kept per session id (X-Session-Id header); idle
+# sessions are dropped after CHAT_SESSION_TTL_SECONDS.
+MAX_CHAT_SESSIONS = 1024
+CHAT_SESSION_TTL_SECONDS = 3600
+
+
+def _new_history() -> Deque[BaseMessage]:
+    # The deque evicts the oldest messages itself once maxlen is reached
+    return deque(maxlen=MAX_HISTORY_MESSAGES)
+
+
+# Like the current video: each API request sees its session's history
+# (installed by the bind_chat_session middleware). Outside a request
+# (CLI, eval scripts) everyone shares one process-wide conversation.
+CHAT_HISTORY: ContextVar[Deque[BaseMessage]] = ContextVar(
+    "chat_history", default=_new_history()
+)
+
+_CHAT_SESSIONS: TTLCache = TTLCache(
+    maxsize=MAX_CHAT_SESSIONS, ttl=CHAT_SESSION_TTL_SECONDS
+)
+_CHAT_SESSIONS_LOCK = threading.Lock()
+
+
+def start_chat_session(session_id: str) -> None:
+    """Use the history of `session_id` (created if new) in the current context."""
+    with _CHAT_SESSIONS_LOCK:
+        history = _CHAT_SESSIONS.get(session_id)
+        if history is None:
+            history = _new_history()
+        # Re-inserting restarts the idle timer
+        _CHAT_SESSIONS[session_id] = history
+    CHAT_HISTORY.set(history)
+
+
+def get_chat_history() -> Deque[BaseMessage]:
+    """The chat history of the current session."""
+    return CHAT_HISTORY.get()
+
+# -------- "Current" YouTube video for this request / session --------
 
-# -------- "Current" YouTube video for this process / session --------
-CURRENT_YOUTUBE_ID: Optional[str] = None
+
+class _CurrentVideo:
+    """Mutable holder so tools (which LangChain runs in a copied context) can update it."""
+
+    __slots__ = ("youtube_id",)
+
+    def __init__(self, youtube_id: Optional[str] = None) -> None:
+        self.youtube_id = youtube_id
+
+
+# The ContextVar holds a per-request _CurrentVideo (installed by the API
+# middleware via start_video_scope), so concurrent users can't overwrite
+# each other's video. Outside a request (CLI, eval scripts) everyone
+# shares the process-wide default, which keeps the old session behaviour.
+CURRENT_YOUTUBE_ID: ContextVar[_CurrentVideo] = ContextVar(
+    "current_youtube_id", default=_CurrentVideo()
+)
+
+
+def start_video_scope(youtube_id: Optional[str] = None) -> None:
+    """
+    Give the current context (e.g. one API request) its own 'current' video.
+
+    Everything called from this context - including to_thread workers,
+    parallel_map tasks and LangChain tools - shares the new holder.
+    """
+    CURRENT_YOUTUBE_ID.set(_CurrentVideo(youtube_id))
 
 
 def set_current_youtube_id(youtube_id: str) -> None:
     """
-    Remember the 'current' YouTube video for this Python process.
+    Remember the 'current' YouTube video for this request / session.
 
     RAG + metadata helpers use this when the user asks follow-up
     questions without repeating the URL or ID.
     """
-    global CURRENT_YOUTUBE_ID
-    CURRENT_YOUTUBE_ID = youtube_id
+    CURRENT_YOUTUBE_ID.get().youtube_id = youtube_id
+
+
+def get_current_youtube_id() -> Optional[str]:
+    """Return the 'current' YouTube video for this request / session (or None)."""
+    return CURRENT_YOUTUBE_ID.get().youtube_id
+
+
+async def bind_current_video(request: Any, call_next: Callable[[Any], Awaitable[Any]]) -> Any:
+    """
+    HTTP middleware giving every request its own 'current' video.
+
+    Clients send the video they are talking about in an X-Youtube-Id
+    header; the (possibly updated, e.g. after ingestion) id is echoed back
+    in the response so follow-up requests can pass it again. Install with
+    app.middleware("http")(bind_current_video).
+    """
+    start_video_scope(request.headers.get("x-youtube-id") or None)
+    response = await call_next(request)
+    youtube_id = get_current_youtube_id()
+    if youtube_id:
+        response.headers["X-Youtube-Id"] = youtube_id
+    return response
+
+
+async def bind_chat_session(request: Any, call_next: Callable[[Any], Awaitable[Any]]) -> Any:
+    """
+    HTTP middleware giving every conversation its own chat history.
+
+    Clients send their session id in an X-Session-Id header; without one a
+    new session is started. The id is echoed back in the response so the
+    next message can pass it. Install with
+    app.middleware("http")(bind_chat_session).
+    """
+    session_id = request.headers.get("x-session-id") or uuid4().hex
+    start_chat_session(session_id)
+    response = await call_next(request)
+    response.headers["X-Session-Id"] = session_id
+    return response
@@ -0,0 +1,107 @@
+# evrika/embedding_cache.py
+"""
+Persistent embedding cache (SQLite on disk), keyed by content hash.
+
+Re-ingesting a video or asking a question that was asked before (even in
+an earlier process) reuses the stored vector instead of calling the
+embeddings API again. Vectors are stored as float32 blobs.
+
+Used by config.CachedEmbeddings underneath its in-memory LRU, so every
+get_embeddings() caller benefits without changes.
+"""
+
+import functools
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import Callable, Dict, List
+
+import numpy as np
+
+CACHE_DIR = os.getenv("EVRIKA_CACHE_DIR", "./.evrika_cache")
+EMBEDDING_DB_PATH = os.path.join(CACHE_DIR, "embeddings.sqlite3")
+
+# SQLite caps the number of ? parameters per statement
+_MAX_PARAMS_PER_QUERY = 500
+
+_DB_LOCK = threading.Lock()
+
+
+def content_key(text: str, model: str = "") -> str:
+    """Cache key for `text` embedded with `model`."""
+    return hashlib.blake2b(
+        (model + "\x00" + text).encode("utf-8"), digest_size=16
+    ).hexdigest()
+
+
+@functools.cache
+def _get_db() -> sqlite3.Connection:
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    conn = sqlite3.connect(
+        EMBEDDING_DB_PATH, check_same_thread=False, isolation_level=None
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS cache (hash TEXT PRIMARY KEY, vec BLOB NOT NULL)")
+    return conn
+
+
+def _load(keys: List[str]) -> Dict[str, List[float]]:
+    found: Dict[str, List[float]] = {}
+    db = _get_db()
+    with _DB_LOCK:
+        for i in range(0, len(keys), _MAX_PARAMS_PER_QUERY):
+            part = keys[i : i + _MAX_PARAMS_PER_QUERY]
+            rows = db.execute(
+                f"SELECT hash, vec FROM cache WHERE hash IN ({','.join('?' * len(part))})",
+                part,
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+    return found
+
+
+def _store(vectors: Dict[str, List[float]]) -> None:
+    rows = [
+        (key, np.asarray(vec, dtype=np.float32).tobytes())
+        for key, vec in vectors.items()
+    ]
+    db = _get_db()
+    with _DB_LOCK:
+        db.executemany("INSERT OR REPLACE INTO cache (hash, vec) VALUES (?, ?)", rows)
+
+
+def get_or_compute(
+    texts: List[str],
+    embed_fn: Callable[[List[str]], List[List[float]]],
+    model: str = "",
+) -> List[List[float]]:
+    """
+    Vectors for `texts`, in order.
+
+    Texts already on disk are read back; only the misses (deduplicated)
+    are passed to embed_fn, and their vectors are written to disk. If the
+    cache directory or file can't be used, everything is simply computed.
+    """
+    keys = [content_key(text, model) for text in texts]
+
+    try:
+        found = _load(list(dict.fromkeys(keys)))
+    except (OSError, sqlite3.Error) as e:
+        print(f"[EMBED-CACHE] Warning: failed to read cache ({e}), computing all.")
+        found = {}
+
+    missing: Dict[str, str] = {}
+    for key, text in zip(keys, texts):
+        if key not in found:
+            missing.setdefault(key, text)
+
+    if missing:
+        computed = dict(zip(missing, embed_fn(list(missing.values()))))
+        try:
+            _store(computed)
+        except (OSError, sqlite3.Error) as e:
+            print(f"[EMBED-CACHE] Warning: failed to write cache: {e}")
+        found.update(computed)
+
+    return [found[key] for key in keys]
@@ -0,0 +1,108 @@
+# evrika/llm_cache.py
+"""
+Persistent (SQLite) cache of LLM completions, keyed by (model, prompt).
+
+Regenerating a brief or asking a question that was answered before
+returns the stored text instead of paying for another completion. The
+LLM runs with temperature 0, so a cached answer is what the model would
+have said anyway. Entries expire after LLM_CACHE_TTL_SECONDS. If the
+cache directory or database can't be used, the model is called directly.
+"""
+
+import functools
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, List, Optional, Union
+
+from langchain_core.messages import BaseMessage
+
+from .embedding_cache import CACHE_DIR
+
+LLM_CACHE_DB_PATH = os.path.join(CACHE_DIR, "llm.sqlite3")
+LLM_CACHE_TTL_SECONDS = 7 * 24 * 3600
+
+# EVRIKA_LLM_CACHE=0 (or setting this to False, as eval_ragas.py does)
+# sends every prompt to the model.
+LLM_CACHE_ENABLED = os.getenv("EVRIKA_LLM_CACHE", "1") != "0"
+
+_DB_LOCK = threading.Lock()
+
+
+@functools.cache
+def _get_db() -> sqlite3.Connection:
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    conn = sqlite3.connect(
+        LLM_CACHE_DB_PATH, check_same_thread=False, isolation_level=None
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS cache "
+        "(key TEXT PRIMARY KEY, content TEXT NOT NULL, ts REAL NOT NULL)"
+    )
+    return conn
+
+
+Prompt = Union[str, List[BaseMessage]]
+
+
+def _cache_key(llm: Any, prompt: Prompt) -> str:
+    model = getattr(llm, "model_name", None) or getattr(llm, "model", "")
+    if not isinstance(prompt, str):
+        prompt = "\x00".join(f"{m.type}\x01{m.content}" for m in prompt)
+    return hashlib.sha256((str(model) + "\x00" + prompt).encode("utf-8")).hexdigest()
+
+
+def _lookup(key: str) -> Optional[str]:
+    try:
+        with _DB_LOCK:
+            row = _get_db().execute(
+                "SELECT content, ts FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+    except (OSError, sqlite3.Error) as e:
+        print(f"[LLM-CACHE] Warning: failed to read cache: {e}")
+        return None
+    if row is None or time.time() - row[1] > LLM_CACHE_TTL_SECONDS:
+        return None
+    return row[0]
+
+
+def _remember(key: str, content: str) -> None:
+    try:
+        with _DB_LOCK:
+            _get_db().execute(
+                "INSERT OR REPLACE INTO cache (key, content, ts) VALUES (?, ?, ?)",
+                (key, content, time.time()),
+            )
+    except (OSError, sqlite3.Error) as e:
+        print(f"[LLM-CACHE] Warning: failed to write cache: {e}")
+
+
+def _invoke_text(llm: Any, prompt: Prompt) -> str:
+    """
+    Stream the completion and join the chunks' text.
+
+    Chat models always yield message chunks with .content, so there is no
+    str(response) fallback; anything else is a bug and should raise.
+    """
+    return "".join(chunk.content for chunk in llm.stream(prompt))
+
+
+def cached_invoke(llm: Any, prompt: Prompt) -> str:
+    """
+    llm.invoke(prompt) -> text, served from the cache when the same model
+    has already answered the same prompt (a string or a list of messages).
+    """
+    if not LLM_CACHE_ENABLED:
+        return _invoke_text(llm, prompt)
+
+    key = _cache_key(llm, prompt)
+    content = _lookup(key)
+    if content is not None:
+        return content
+
+    content = _invoke_text(llm, prompt)
+    _remember(key, content)
+    return content
@@ -12,124 +12,156 @@ IMPORTANT: we deliberately return ONLY a small subset of metadata
 to avoid context_length_exceeded errors.
 """
 
-import json
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-from langchain_core.tools import tool
+from langchain_core.tools import StructuredTool
 
-from . import config
-from .rag_pipeline import extract_youtube_id
+from . import config, video_cache
+from .youtube_ids import extract_youtube_id
 
 
-def _get_video_metadata_from_supabase(youtube_id: str) -> Optional[Dict[str, Any]]:
-    """
-    Load a single metadata record for the given youtube_id from the 'documents' table.
+# -------- Tool input / output helpers (shared by both tools) --------
 
-    Because each chunk shares the same video-level metadata, we only need one row.
-    """
-    resp = (
-        config.supabase.table("documents")
-        .select("metadata")
-        .contains("metadata", {"youtube_id": youtube_id})
-        .limit(1)
-        .execute()
-    )
-
-    rows = resp.data or []
-    if not rows:
-        return None
-
-    metadata = rows[0].get("metadata") or {}
-    if isinstance(metadata, str):
-        try:
-            metadata = json.loads(metadata)
-        except Exception:
-            metadata = {}
-
-    # This raw_meta can be HUGE – we will only use it to derive a few fields,
-    # but we will NOT include it in the result we send to the LLM.
-    raw_meta = metadata.get("raw_meta") or {}
-
-    # ---- Compact, safe view for the LLM (NO raw_meta!) ----
-    title = metadata.get("title") or raw_meta.get("title")
-    url = metadata.get("url") or raw_meta.get("webpage_url")
-
-    duration_seconds = metadata.get("duration_seconds") or raw_meta.get("duration")
-
-    channel = (
-        metadata.get("channel")
-        or raw_meta.get("channel")
-        or raw_meta.get("uploader")
-    )
-
-    speaker = (
-        metadata.get("speaker")
-        or raw_meta.get("uploader")
-        or channel
-    )
-
-    published_at = metadata.get("published_at")
-    if not published_at:
-        upload_date = metadata.get("upload_date") or raw_meta.get("upload_date")
-        if isinstance(upload_date, str) and len(upload_date) == 8 and upload_date.isdigit():
-            published_at = f"{upload_date[0:4]}-{upload_date[4:6]}-{upload_date[6:8]}"
-        else:
-            published_at = upload_date
-
-    # NOTE: we intentionally DO NOT include the huge raw_meta blob here.
+# Tool output is re-read by the LLM on every later turn, so it uses short
+# keys (documented in the tool descriptions) and omits nulls. Tools return
+# plain dicts; the agent serializes them once (compact orjson). Key order
+# is fixed so repeated outputs stay byte-identical.
+_COMPACT_KEYS = (
+    ("youtube_id", "id"),
+    ("title", "t"),
+    ("url", "u"),
+    ("channel", "ch"),
+    ("speaker", "sp"),
+    ("duration_seconds", "dur"),
+    ("published_at", "pub"),
+)
+
+
+def _compact(meta_view: Dict[str, Any], include_id: bool = True) -> Dict[str, Any]:
     return {
-        "youtube_id": youtube_id,
-        "title": title,
-        "url": url,
-        "channel": channel,
-        "speaker": speaker,
-        "duration_seconds": duration_seconds,
-        "published_at": published_at,
+        short: meta_view[key]
+        for key, short in _COMPACT_KEYS
+        if meta_view.get(key) is not None and (include_id or key != "youtube_id")
     }
 
 
-@tool("video_metadata")
-def video_metadata_tool(video_hint: str = "") -> str:
-    """
-    Get metadata for a YouTube video (title, speaker, channel, duration, publish date, URL).
-
-    - video_hint: optional YouTube URL or ID. If omitted, uses the most recently
-      ingested / referenced video in this session.
-
-    Returns a SMALL JSON string with keys:
-      - youtube_id
-      - title
-      - url
-      - channel
-      - speaker
-      - duration_seconds
-      - published_at
-    """
+def _resolve_video_hint(video_hint: str) -> Tuple[Optional[str], Optional[Dict[str, str]]]:
+    """Return (youtube_id, None) or (None, {"error": message for the LLM})."""
     youtube_id: Optional[str] = None
 
     # 1) Try to parse explicit hint if provided
     if video_hint:
         try:
             youtube_id = extract_youtube_id(video_hint)
-        except Exception as e:
-            return f"Could not extract a YouTube ID from video_hint={video_hint!r}: {e}"
+        except ValueError as e:
+            return None, {
+                "error": f"Could not extract a YouTube ID from video_hint={video_hint!r}: {e}"
+            }
 
     # 2) Fall back to the 'current' video if we have one
     if not youtube_id:
-        youtube_id = config.CURRENT_YOUTUBE_ID
+        youtube_id = config.get_current_youtube_id()
 
     if not youtube_id:
-        return (
-            "I don't know which video you mean. "
-            "Please either provide a YouTube URL/ID or ingest a video first using fetch_video."
-        )
+        return None, {
+            "error": (
+                "I don't know which video you mean. "
+                "Please either provide a YouTube URL/ID or ingest a video first using fetch_video."
+            )
+        }
+    return youtube_id, None
 
-    meta_view = _get_video_metadata_from_supabase(youtube_id)
+
+def _format_single(youtube_id: str, meta_view: Optional[Dict[str, Any]]) -> Dict[str, Any]:
     if not meta_view:
-        return f"No metadata found in Supabase for youtube_id={youtube_id}."
+        return {"error": f"No metadata found in Supabase for youtube_id={youtube_id}."}
 
     # Keep CURRENT_YOUTUBE_ID in sync
     config.set_current_youtube_id(youtube_id)
 
-    # This JSON is small enough to safely send to the LLM
-    return json.dumps(meta_view, default=str)
+    # This view is small enough to safely send to the LLM
+    return _compact(meta_view)
+
+
+def _parse_video_hints(video_hints: List[str]) -> Tuple[List[str], Dict[str, Any]]:
+    """Return (deduplicated youtube_ids, {hint: error} for unparseable hints)."""
+    errors: Dict[str, Any] = {}
+    youtube_ids: List[str] = []
+    for hint in video_hints:
+        try:
+            youtube_id = extract_youtube_id(hint)
+        except ValueError as e:
+            errors[hint] = {"error": f"Could not extract a YouTube ID: {e}"}
+            continue
+        if youtube_id not in youtube_ids:
+            youtube_ids.append(youtube_id)
+    return youtube_ids, errors
+
+
+def _format_batch(
+    youtube_ids: List[str],
+    errors: Dict[str, Any],
+    views: Dict[str, Dict[str, Any]],
+) -> Dict[str, Any]:
+    result: Dict[str, Any] = dict(errors)
+    for youtube_id in youtube_ids:
+        meta_view = views.get(youtube_id)
+        result[youtube_id] = (
+            _compact(meta_view, include_id=False)
+            if meta_view
+            else {"error": "No metadata found in Supabase."}
+        )
+    return result
+
+
+# -------- Tools --------
+
+
+def _video_metadata(video_hint: str = "") -> Dict[str, Any]:
+    """
+    Get metadata for a YouTube video (title, speaker, channel, duration, publish date, URL).
+
+    - video_hint: optional YouTube URL or ID. If omitted, uses the most recently
+      ingested / referenced video in this session.
+
+    Returns a SMALL JSON object with short keys (missing fields are omitted):
+      - id: YouTube video ID
+      - t: title
+      - u: URL
+      - ch: channel
+      - sp: speaker
+      - dur: duration in seconds
+      - pub: publish date (YYYY-MM-DD)
+    or {"error": ...} if the video is unknown.
+    """
+    youtube_id, error = _resolve_video_hint(video_hint)
+    if error:
+        return error
+    return _format_single(youtube_id, video_cache.get_video(youtube_id))
+
+
+def _video_metadata_batch(video_hints: List[str]) -> Dict[str, Any]:
+    """
+    Get metadata for SEVERAL YouTube videos at once (e.g. to compare them).
+
+    - video_hints: list of YouTube URLs or IDs.
+
+    Returns a SMALL JSON object mapping each youtube_id to the same short
+    keys as video_metadata (t=title, u=URL, ch=channel, sp=speaker,
+    dur=duration in seconds, pub=publish date), or to {"error": ...} if the
+    video is unknown / the hint could not be parsed.
+    """
+    youtube_ids, errors = _parse_video_hints(video_hints)
+    # One Supabase round-trip for every video not already cached
+    return _format_batch(youtube_ids, errors, video_cache.get_videos(youtube_ids))
+
+
+video_metadata_tool = StructuredTool.from_function(
+    func=_video_metadata,
+    name="video_metadata",
+)
+
+video_metadata_batch_tool = StructuredTool.from_function(
+    func=_video_metadata_batch,
+    name="video_metadata_batch",
+)
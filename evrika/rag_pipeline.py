@@ -10,65 +10,52 @@ This module handles:
 - Saving a brief as a PDF.
 """
 
+import functools
+import hashlib
+import io
 import json
+import os
+import re
+import threading
+from concurrent.futures import Future
 from datetime import datetime
 from typing import Any, Dict, List, Optional
-from urllib.parse import urlparse, parse_qs
 
+from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.tools import tool
 
+from . import video_cache
 from .config import (
-    supabase,
-    embeddings,
-    llm,
+    get_supabase,
+    get_embeddings,
+    get_llm,
     set_current_youtube_id,
-    CURRENT_YOUTUBE_ID,
+    get_current_youtube_id,
+    EXECUTOR,
+)
+from .llm_cache import cached_invoke
+from .semantic_cache import SemanticCache, embed_question
+from .supabase_store import (
+    halfvec_literal,
+    insert_document_rows,
+    pending_document_rows,
+    upload_raw_meta,
 )
 from .transcripts import (
     fetch_metadata_with_ytdlp,
     fetch_audio_with_ytdlp,
+    has_listed_captions,
     try_fetch_transcript_via_api,
     transcribe_with_whisper,
 )
+from .youtube_ids import extract_youtube_id
 
 # ---------------------------------------------------------------------------
 # BASIC HELPERS
 # ---------------------------------------------------------------------------
 
 
-def extract_youtube_id(url_or_id: str) -> str:
-    """
-    Extract a YouTube video ID from either:
-    - a plain 11-character ID
-    - a full YouTube URL
-    - a youtu.be short URL
-    """
-    if not url_or_id:
-        raise ValueError("Empty YouTube URL/ID")
-
-    # If it looks like a bare ID (11 chars, no slash), accept it
-    if len(url_or_id) == 11 and "/" not in url_or_id and "?" not in url_or_id:
-        return url_or_id
-
-    parsed = urlparse(url_or_id)
-
-    # youtu.be/<id>
-    if parsed.hostname in {"youtu.be"}:
-        vid = parsed.path.lstrip("/")
-        if vid:
-            return vid
-
-    # youtube.com/watch?v=<id>
-    qs = parse_qs(parsed.query)
-    if "v" in qs and qs["v"]:
-        return qs["v"][0]
-
-    # Fallback: last path segment
-    path_parts = [p for p in parsed.path.split("/") if p]
-    if path_parts:
-        return path_parts[-1]
-
-    raise ValueError(f"Could not extract YouTube ID from: {url_or_id}")
+_WORD_RE = re.compile(r"\S+")
 
 
 def chunk_text(text: str, chunk_size: int = 800, overlap: int = 200) -> List[str]:
@@ -78,20 +65,17 @@ def chunk_text(text: str, chunk_size: int = 800, overlap: int = 200) -> List[str
     - chunk_size: approximate number of words per chunk.
     - overlap: number of words to overlap between consecutive chunks.
     """
-    words = text.split()
-    if not words:
+    # (start, end) character offsets of every word; each chunk is then one
+    # slice of the original text instead of a join over a words list.
+    spans = [m.span() for m in _WORD_RE.finditer(text)]
+    if not spans:
         return []
 
+    step = max(1, chunk_size - overlap)
     chunks: List[str] = []
-    start = 0
-    while start < len(words):
-        end = start + chunk_size
-        chunk_words = words[start:end]
-        if not chunk_words:
-            break
-        chunks.append(" ".join(chunk_words))
-        # move forward with overlap
-        start += max(1, chunk_size - overlap)
+    for start in range(0, len(spans), step):
+        end = min(start + chunk_size, len(spans)) - 1
+        chunks.append(text[spans[start][0] : spans[end][1]])
 
     return chunks
 
@@ -101,13 +85,13 @@ def _existing_chunk_count(youtube_id: str) -> int:
     Check how many chunks we already have stored in Supabase for this video.
     """
     resp = (
-        supabase.table("documents")
-        .select("id")
-        .contains("metadata", {"youtube_id": youtube_id})
+        get_supabase().table("documents")
+        .select("id", count="exact", head=True)
+        .eq("metadata->>youtube_id", youtube_id)
         .execute()
     )
-    data = resp.data or []
-    count = len(data)
+    # head=True: only the row count comes back (Content-Range), no rows
+    count = resp.count or 0
     if count:
         print(f"[INGEST] Found {count} existing chunks in Supabase for youtube_id={youtube_id}")
     return count
@@ -118,64 +102,21 @@ def _existing_chunk_count(youtube_id: str) -> int:
 # ---------------------------------------------------------------------------
 
 
-def _fetch_metadata_row(youtube_id: str) -> Optional[Dict[str, Any]]:
-    """
-    Load a single metadata record for the given youtube_id from 'documents'.
-    """
-    resp = (
-        supabase.table("documents")
-        .select("metadata")
-        .contains("metadata", {"youtube_id": youtube_id})
-        .limit(1)
-        .execute()
-    )
-    rows = resp.data or []
-    if not rows:
-        return None
-
-    metadata = rows[0].get("metadata") or {}
-    if isinstance(metadata, str):
-        try:
-            metadata = json.loads(metadata)
-        except Exception:
-            metadata = {}
-    return metadata
-
-
 def _build_metadata_view(youtube_id: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
     """
     Normalize the stored metadata into a compact structure for the LLM.
     """
-    raw_meta = metadata.get("raw_meta") or {}
-
-    title = metadata.get("title") or raw_meta.get("title")
-    url = metadata.get("url") or raw_meta.get("webpage_url")
-
-    duration_seconds = metadata.get("duration_seconds") or raw_meta.get("duration")
-
-    channel = (
-        metadata.get("channel")
-        or raw_meta.get("channel")
-        or raw_meta.get("uploader")
-    )
-
-    speaker = (
-        metadata.get("speaker")
-        or raw_meta.get("speaker")
-        or raw_meta.get("artist")
-    )
+    # All fields are flattened into metadata at ingestion; the raw yt-dlp
+    # info dict lives in Storage (metadata.raw_meta_path), not in the row.
+    title = metadata.get("title")
+    url = metadata.get("url")
+    duration_seconds = metadata.get("duration_seconds")
+    channel = metadata.get("channel")
+    speaker = metadata.get("speaker")
 
     if speaker and channel and speaker == channel:
         speaker = None
 
-    published_at = metadata.get("published_at")
-    if not published_at:
-        upload_date = metadata.get("upload_date") or raw_meta.get("upload_date")
-        if isinstance(upload_date, str) and len(upload_date) == 8 and upload_date.isdigit():
-            published_at = f"{upload_date[0:4]}-{upload_date[4:6]}-{upload_date[6:8]}"
-        else:
-            published_at = upload_date
-
     return {
         "youtube_id": youtube_id,
         "title": title,
@@ -183,62 +124,83 @@ def _build_metadata_view(youtube_id: str, metadata: Dict[str, Any]) -> Dict[str,
         "channel": channel,
         "speaker": speaker,
         "duration_seconds": duration_seconds,
-        "published_at": published_at,
+        # Formatted once at ingestion (older rows backfilled by a migration)
+        "published_at": metadata.get("published_at"),
     }
 
 
+# Phrases that mark a question as being about metadata / recommendations.
+# Each list is compiled once into a single regex alternation, so a question
+# is scanned in one pass instead of one substring search per phrase.
+_METADATA_KEYWORDS = [
+    "title of the video",
+    "video title",
+    "name of the video",
+    "what is the title",
+    "what's the title",
+    "who is the speaker",
+    "who's the speaker",
+    "who is speaking",
+    "who is the host",
+    "how long is the video",
+    "how long is it",
+    "what is the duration",
+    "video duration",
+    "when was this video published",
+    "when was it published",
+    "when was this uploaded",
+    "upload date",
+    "publish date",
+]
+_METADATA_RE = re.compile("|".join(map(re.escape, _METADATA_KEYWORDS)))
+
+_RECOMMENDATION_PATTERNS = [
+    "recommend me similar videos",
+    "recommend similar videos",
+    "similar videos",
+    "similar video",
+    "what should i watch next",
+    "what else should i watch",
+    "follow-up videos",
+    "related videos",
+    "more like this",
+    "next video to watch",
+]
+_RECOMMENDATION_RE = re.compile("|".join(map(re.escape, _RECOMMENDATION_PATTERNS)))
+
+
 def _is_metadata_question(question: str) -> bool:
     q = question.lower().strip()
-    core_keywords = [
-        "title of the video",
-        "video title",
-        "name of the video",
-        "what is the title",
-        "what's the title",
-        "who is the speaker",
-        "who's the speaker",
-        "who is speaking",
-        "who is the host",
-        "how long is the video",
-        "how long is it",
-        "what is the duration",
-        "video duration",
-        "when was this video published",
-        "when was it published",
-        "when was this uploaded",
-        "upload date",
-        "publish date",
-    ]
-    if any(k in q for k in core_keywords):
-        return True
     if "channel" in q:
         return True
     if "url" in q or "link" in q:
         return True
-    return False
+    return _METADATA_RE.search(q) is not None
 
 
 def _is_recommendation_question(question: str) -> bool:
     q = question.lower()
-    explicit_patterns = [
-        "recommend me similar videos",
-        "recommend similar videos",
-        "similar videos",
-        "similar video",
-        "what should i watch next",
-        "what else should i watch",
-        "follow-up videos",
-        "related videos",
-        "more like this",
-        "next video to watch",
-    ]
-    if any(p in q for p in explicit_patterns):
+    if _RECOMMENDATION_RE.search(q):
         return True
     if "recommend" in q and ("video" in q or "watch" in q or "content" in q):
         return True
     return False
 
 
+# Shared, video-independent instructions for both recommendation prompts;
+# kept in a system message so it forms a stable, cacheable prompt prefix.
+RECOMMENDATION_SYSTEM_PROMPT = """
+You are a learning coach inside Evrika Briefs.
+
+Suggest 3–7 concrete follow-up learning steps, including:
+- Search queries they could type into YouTube or Google
+- Concrete topics or subskills to explore next
+- Optional: types of videos (tutorial, case study, lecture, etc.)
+
+Return the answer as a Markdown bullet list.
+""".strip()
+
+
 def _answer_recommendation_question(question: str, youtube_id: Optional[str]) -> str:
     if not youtube_id:
         return (
@@ -255,26 +217,21 @@ def _answer_recommendation_question(question: str, youtube_id: Optional[str]) ->
 
     context = "\n\n".join(doc["content"] for doc in docs[:5])
 
-    prompt = f"""
-You are a learning coach inside Evrika Briefs.
-
+    messages = [
+        SystemMessage(content=RECOMMENDATION_SYSTEM_PROMPT),
+        HumanMessage(
+            content=f"""
 A user has just watched a YouTube video (id={youtube_id}) and asked:
 
 {question}
 
 Here are a few chunks from the video transcript for context:
 \"\"\"{context}\"\"\"
-
-Suggest 3–7 concrete follow-up learning steps, including:
-- Search queries they could type into YouTube or Google
-- Concrete topics or subskills to explore next
-- Optional: types of videos (tutorial, case study, lecture, etc.)
-
-Return the answer as a Markdown bullet list.
 """.strip()
+        ),
+    ]
 
-    response = llm.invoke(prompt)
-    return getattr(response, "content", str(response))
+    return cached_invoke(get_llm(), messages)
 
 
 def _answer_metadata_question(question: str, youtube_id: Optional[str]) -> str:
@@ -284,7 +241,7 @@ def _answer_metadata_question(question: str, youtube_id: Optional[str]) -> str:
             "or provide a specific YouTube URL or ID."
         )
 
-    metadata_row = _fetch_metadata_row(youtube_id)
+    metadata_row = video_cache.get_video(youtube_id)
     if not metadata_row:
         return f"I couldn't find stored metadata for this video (id={youtube_id})."
 
@@ -305,8 +262,7 @@ Answer the question using ONLY this metadata. If something is missing,
 say you are not sure. Answer in 1–3 concise sentences.
 """.strip()
 
-    response = llm.invoke(prompt)
-    return getattr(response, "content", str(response))
+    return cached_invoke(get_llm(), prompt)
 
 
 # ---------------------------------------------------------------------------
@@ -314,58 +270,103 @@ say you are not sure. Answer in 1–3 concise sentences.
 # ---------------------------------------------------------------------------
 
 
-def _store_chunks_and_embeddings(
+def _normalize_upload_date(upload_date: Any) -> Any:
+    """yt-dlp's "YYYYMMDD" -> "YYYY-MM-DD"; anything else is returned unchanged."""
+    if isinstance(upload_date, str) and len(upload_date) == 8 and upload_date.isdigit():
+        return f"{upload_date[:4]}-{upload_date[4:6]}-{upload_date[6:]}"
+    return upload_date
+
+
+def _video_fields(
     youtube_id: str,
     title: str,
     url: str,
-    chunks: List[str],
     raw_meta: Optional[Dict[str, Any]] = None,
-) -> int:
-    if not chunks:
-        print("[INGEST] No chunks to store.")
-        return 0
+) -> Dict[str, Any]:
+    """
+    Video-level metadata derived once at ingestion.
 
-    duration_seconds: Optional[float] = None
-    channel: Optional[str] = None
-    upload_date: Optional[str] = None
-    published_at: Optional[str] = None
+    Same keys (and fallbacks) as the `videos` table row, so the result can
+    also prime video_cache.
+    """
+    raw_meta = raw_meta or {}
 
-    if raw_meta:
-        duration_seconds = raw_meta.get("duration")
-        channel = raw_meta.get("channel") or raw_meta.get("uploader")
-        upload_date = raw_meta.get("upload_date")
-        if isinstance(upload_date, str) and len(upload_date) == 8 and upload_date.isdigit():
-            published_at = f"{upload_date[0:4]}-{upload_date[4:6]}-{upload_date[6:8]}"
-        else:
-            published_at = upload_date
+    channel = raw_meta.get("channel") or raw_meta.get("uploader")
 
-    base_metadata: Dict[str, Any] = {
-        "title": title,
-        "url": url,
+    upload_date = raw_meta.get("upload_date")
+
+    return {
         "youtube_id": youtube_id,
-        "source": "evrika-briefs",
-        "duration_seconds": duration_seconds,
+        "title": title or raw_meta.get("title"),
+        "url": url or raw_meta.get("webpage_url"),
         "channel": channel,
-        "published_at": published_at,
-        "raw_meta": raw_meta or {},
+        "speaker": raw_meta.get("speaker") or raw_meta.get("artist"),
+        "duration_seconds": raw_meta.get("duration"),
+        "upload_date": upload_date,
+        "published_at": _normalize_upload_date(upload_date),
     }
 
-    print(f"[INGEST] Embedding {len(chunks)} chunks...")
-    vectors = embeddings.embed_documents(chunks)
-
-    rows: List[Dict[str, Any]] = []
-    for content, embedding in zip(chunks, vectors):
-        rows.append(
-            {
-                "content": content,
-                "metadata": base_metadata,
-                "embedding": embedding,
-            }
-        )
 
-    supabase.table("documents").insert(rows).execute()
-    print(f"[INGEST] Stored {len(rows)} chunks in Supabase.")
-    return len(rows)
+def _store_chunks_and_embeddings(
+    youtube_id: str,
+    title: str,
+    url: str,
+    chunks: List[str],
+    raw_meta: Optional[Dict[str, Any]] = None,
+) -> int:
+    if not chunks:
+        print("[INGEST] No chunks to store.")
+        return 0
+
+    chunk_metadata = {"youtube_id": youtube_id}
+
+    # Repetitive transcripts (music intros, sponsor reads) can produce
+    # identical chunks; store and embed each distinct text only once.
+    seen: set = set()
+    unique_chunks: List[str] = []
+    for chunk in chunks:
+        digest = hashlib.blake2b(chunk.encode("utf-8"), digest_size=16).digest()
+        if digest not in seen:
+            seen.add(digest)
+            unique_chunks.append(chunk)
+    if len(unique_chunks) < len(chunks):
+        print(f"[INGEST] Dropped {len(chunks) - len(unique_chunks)} duplicate chunks.")
+    chunks = unique_chunks
+
+    # Chunks left over from an interrupted run keep their (content-derived)
+    # ids; only the missing ones are embedded and inserted.
+    pending = pending_document_rows(chunks, [chunk_metadata] * len(chunks))
+    if pending:
+        new_chunks = [chunks[i] for _, i in pending]
+        print(f"[INGEST] Embedding {len(new_chunks)} chunks...")
+        vectors = get_embeddings().embed_documents(new_chunks)
+        count = insert_document_rows(
+            new_chunks,
+            [chunk_metadata] * len(new_chunks),
+            vectors,
+            ids=[row_id for row_id, _ in pending],
+        )
+        print(f"[INGEST] Stored {count} chunks in Supabase.")
+
+    # Video-level metadata is one `videos` row; chunks only carry the id.
+    # published_at is generated by the database from upload_date. The row
+    # is written last, so it also marks the ingestion as complete.
+    video_row = {
+        key: value
+        for key, value in _video_fields(youtube_id, title, url, raw_meta).items()
+        if key != "published_at"
+    }
+    # The full yt-dlp info dict goes to Storage; the row keeps a reference.
+    # If the upload fails, no videos row is written, so the next ingest of
+    # this video resumes (stored chunks are kept) and retries the upload.
+    raw_meta_path = None
+    if raw_meta:
+        raw_meta_path = upload_raw_meta(youtube_id, raw_meta)
+        if raw_meta_path is None:
+            raise RuntimeError(f"Failed to upload raw_meta for {youtube_id}")
+    video_row["raw_meta_path"] = raw_meta_path
+    get_supabase().table("videos").upsert(video_row, on_conflict="youtube_id").execute()
+    return len(chunks)
 
 
 # ---------------------------------------------------------------------------
@@ -375,9 +376,9 @@ def _store_chunks_and_embeddings(
 
 def _get_all_chunks_for_video(youtube_id: str) -> List[Dict[str, Any]]:
     resp = (
-        supabase.table("documents")
-        .select("id, content, metadata")
-        .contains("metadata", {"youtube_id": youtube_id})
+        get_supabase().table("documents")
+        .select("id, content")
+        .eq("metadata->>youtube_id", youtube_id)
         .execute()
     )
     data = resp.data or []
@@ -385,36 +386,88 @@ def _get_all_chunks_for_video(youtube_id: str) -> List[Dict[str, Any]]:
     return data
 
 
+# Optional cross-encoder reranking (pip install sentence-transformers).
+# Retrieval over-fetches RETRIEVAL_CANDIDATES chunks and keeps the best
+# QA_CONTEXT_CHUNKS, so the QA prompt carries fewer, better chunks.
+RERANK_MODEL_NAME = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+RETRIEVAL_CANDIDATES = 12
+QA_CONTEXT_CHUNKS = 3
+
+_reranker: Any = None
+_reranker_loaded = False
+_reranker_lock = threading.Lock()
+
+
+def _get_reranker() -> Any:
+    """Load the cross-encoder once; None if sentence-transformers is unavailable."""
+    global _reranker, _reranker_loaded
+    with _reranker_lock:
+        if not _reranker_loaded:
+            _reranker_loaded = True
+            try:
+                from sentence_transformers import CrossEncoder
+
+                _reranker = CrossEncoder(RERANK_MODEL_NAME)
+                print(f"[RERANK] Loaded {RERANK_MODEL_NAME}")
+            except ImportError:
+                print("[RERANK] sentence-transformers not installed; using vector order.")
+            except Exception as e:
+                print(f"[RERANK] Could not load {RERANK_MODEL_NAME}: {e}")
+        return _reranker
+
+
+def warm_up_reranker() -> None:
+    """
+    Load the cross-encoder at startup (downloading it on first run), so the
+    first question doesn't wait for it. No-op without sentence-transformers.
+    """
+    _get_reranker()
+
+
+def _rerank(query: str, docs: List[Dict[str, Any]], top_k: int) -> List[Dict[str, Any]]:
+    """Order docs by cross-encoder relevance to `query` and keep `top_k`."""
+    reranker = _get_reranker()
+    if reranker is None or len(docs) <= 1:
+        return docs[:top_k]
+
+    scores = reranker.predict([(query, d.get("content", "")) for d in docs])
+    ranked = sorted(zip(scores, docs), key=lambda pair: pair[0], reverse=True)
+    return [d for _, d in ranked[:top_k]]
+
+
 def _match_documents(
     query: str,
     youtube_id: Optional[str] = None,
     match_count: int = 6,
+    query_embedding: Optional[List[float]] = None,
+    rerank_top_k: Optional[int] = None,
 ) -> List[Dict[str, Any]]:
-    query_embedding = embeddings.embed_query(query)
+    """
+    Retrieve the top chunks for `query` via the match_documents RPC.
 
-    initial_match_count = match_count if youtube_id is None else max(
-        match_count * 3, match_count + 10
-    )
+    Pass `query_embedding` when the caller already has the vector
+    (e.g. from a batched embedding call) to skip the embedding request.
+
+    With `rerank_top_k`, the `match_count` candidates are reranked with a
+    cross-encoder (if available) and only the best `rerank_top_k` are returned.
+    """
+    if query_embedding is None:
+        query_embedding = get_embeddings().embed_query(query)
 
     payload: Dict[str, Any] = {
-        "query_embedding": query_embedding,
-        "match_count": initial_match_count,
+        "query_embedding": halfvec_literal(query_embedding),
+        "match_count": match_count,
     }
-
-    resp = supabase.rpc("match_documents", payload).execute()
-    docs = resp.data or []
-
     if youtube_id:
-        filtered: List[Dict[str, Any]] = []
-        for d in docs:
-            meta = d.get("metadata") or {}
-            if meta.get("youtube_id") == youtube_id:
-                filtered.append(d)
-        docs = filtered
+        # Filtered in the database (see the match_documents migration)
+        payload["filter_youtube_id"] = youtube_id
 
-    docs = docs[:match_count]
+    resp = get_supabase().rpc("match_documents", payload).execute()
+    docs = resp.data or []
+    print(f"[SUPABASE] Retrieved {len(docs)} docs from match_documents.")
 
-    print(f"[SUPABASE] Retrieved {len(docs)} docs from match_documents (after filtering).")
+    if rerank_top_k is not None:
+        docs = _rerank(query, docs, rerank_top_k)
     return docs
 
 
@@ -423,6 +476,19 @@ def _match_documents(
 # ---------------------------------------------------------------------------
 
 
+def _discard_downloaded_audio(future: Future) -> None:
+    """Done-callback: remove the mp3 of a download that lost to captions."""
+    try:
+        audio_path, _ = future.result()
+    except Exception:
+        return  # cancelled or failed: fetch_audio_with_ytdlp cleaned up
+    try:
+        os.remove(audio_path)
+        print(f"[INGEST] Removed unused audio {audio_path}")
+    except OSError as e:
+        print(f"[INGEST] Warning: could not remove unused audio {audio_path}: {e}")
+
+
 def ingest_youtube(url: str) -> Dict[str, Any]:
     """
     Ingest a YouTube video into Supabase if not already present.
@@ -430,7 +496,10 @@ def ingest_youtube(url: str) -> Dict[str, Any]:
     youtube_id = extract_youtube_id(url)
 
     existing_count = _existing_chunk_count(youtube_id)
-    if existing_count:
+    if existing_count and video_cache.get_video(youtube_id) is None:
+        # Chunks without a videos row: an earlier run stopped halfway
+        print("[INGEST] Resuming interrupted ingestion; stored chunks are kept.")
+    elif existing_count:
         print("[INGEST] Skipping ingestion; already found chunks.")
         set_current_youtube_id(youtube_id)
         return {
@@ -444,12 +513,33 @@ def ingest_youtube(url: str) -> Dict[str, Any]:
     youtube_id = meta.get("id", youtube_id)
     title = meta.get("title", "")
 
-    transcript_text = try_fetch_transcript_via_api(youtube_id)
+    if has_listed_captions(meta):
+        # Captions are listed in the metadata: fetch them first and only
+        # download audio if that fails.
+        audio_future = None
+        transcript_text = try_fetch_transcript_via_api(youtube_id)
+    else:
+        # None listed: start the audio download while the captions API is
+        # tried anyway, so the likely failure costs no extra time. If
+        # captions arrive after all, the download is cancelled.
+        cancel_download = threading.Event()
+        audio_future = EXECUTOR.submit(fetch_audio_with_ytdlp, url, cancel_download)
+        transcript_text = try_fetch_transcript_via_api(youtube_id)
+        if transcript_text:
+            cancel_download.set()
+            if not audio_future.cancel():
+                # Already past the download (or in ffmpeg): drop the file
+                # once it is written.
+                audio_future.add_done_callback(_discard_downloaded_audio)
 
     if not transcript_text:
         print("[INGEST] Falling back to Whisper on audio via yt-dlp...")
-        audio_path, meta = fetch_audio_with_ytdlp(url)
-        transcript_text = transcribe_with_whisper(audio_path)
+        if audio_future is None or audio_future.cancel():
+            # Not started (or pool busy and not started yet): run it here
+            audio_path, meta = fetch_audio_with_ytdlp(url)
+        else:
+            audio_path, meta = audio_future.result()
+        transcript_text = transcribe_with_whisper(audio_path, duration_s=meta.get("duration"))
 
     chunks = chunk_text(transcript_text)
     chunk_count = _store_chunks_and_embeddings(
@@ -462,6 +552,15 @@ def ingest_youtube(url: str) -> Dict[str, Any]:
 
     set_current_youtube_id(youtube_id)
 
+    if chunk_count:
+        # The first metadata question about this video is served from memory
+        video_cache.prime(
+            youtube_id,
+            _video_fields(youtube_id, title, meta.get("webpage_url", url), meta),
+        )
+    else:
+        video_cache.invalidate(youtube_id)
+
     print(f"[INGEST] Completed ingestion for youtube_id={youtube_id}")
     return {
         "title": title,
@@ -475,6 +574,21 @@ def ingest_youtube(url: str) -> Dict[str, Any]:
 # ---------------------------------------------------------------------------
 
 
+def _resolve_video(video_hint: str, log_tag: str) -> Optional[str]:
+    """
+    youtube_id for a tool's video_hint, remembered as the current video.
+
+    Returns None (and logs under `log_tag`) if the hint can't be parsed.
+    """
+    try:
+        youtube_id = extract_youtube_id(video_hint)
+    except ValueError as e:
+        print(f"[{log_tag}] Failed to parse video_hint '{video_hint}': {e}")
+        return None
+    set_current_youtube_id(youtube_id)
+    return youtube_id
+
+
 @tool
 def fetch_video(url: str) -> str:
     """
@@ -495,35 +609,47 @@ def semantic_search(question: str, video_hint: str = "") -> str:
     """
     Search the ingested video semantically and return the top matching chunks.
     """
-    youtube_id: Optional[str] = None
-    if video_hint:
-        try:
-            youtube_id = extract_youtube_id(video_hint)
-            set_current_youtube_id(youtube_id)
-        except Exception as e:
-            print(f"[SEMANTIC_SEARCH] Failed to parse video_hint '{video_hint}': {e}")
+    youtube_id = _resolve_video(video_hint, "SEMANTIC_SEARCH") if video_hint else None
 
     docs = _match_documents(question, youtube_id=youtube_id, match_count=6)
     if not docs:
         return "No matching chunks found in the knowledge base."
 
-    formatted_chunks = []
-    for i, doc in enumerate(docs, start=1):
-        formatted_chunks.append(f"[Chunk {i}]\n{doc.get('content', '')}")
+    return "\n\n---\n\n".join(
+        f"[Chunk {i}]\n{doc['content']}" for i, doc in enumerate(docs, start=1)
+    )
 
-    return "\n\n---\n\n".join(formatted_chunks)
 
+# QA answers per video, matched on question similarity (see semantic_cache).
+# eval_ragas.py turns it off: every gold question must be answered.
+QA_PROMPT_TEMPLATE = """
+You are Evrika Briefs, an assistant that answers questions about YouTube videos
+using their transcript chunks.
 
-def _run_qa(question: str, video_hint: str = "") -> str:
-    youtube_id: Optional[str] = None
-    if video_hint:
-        try:
-            youtube_id = extract_youtube_id(video_hint)
-            set_current_youtube_id(youtube_id)
-        except Exception as e:
-            print(f"[VIDEO_CHAT] Failed to parse video_hint '{video_hint}': {e}")
-    else:
-        youtube_id = CURRENT_YOUTUBE_ID
+Use ONLY the information from the provided chunks to answer the question.
+If the answer is not clearly in the chunks, say that you are not sure.
+
+Relevant chunks:
+{context}
+
+User question:
+{question}
+
+Answer in a clear, concise way, 3–7 sentences maximum.
+""".strip()
+
+QA_SEMANTIC_CACHE_ENABLED = True
+_QA_CACHE = SemanticCache()
+
+
+def _run_qa(
+    question: str,
+    video_hint: str = "",
+    query_embedding: Optional[List[float]] = None,
+) -> str:
+    youtube_id = (
+        _resolve_video(video_hint, "VIDEO_CHAT") if video_hint else get_current_youtube_id()
+    )
 
     if _is_metadata_question(question):
         return _answer_metadata_question(question, youtube_id)
@@ -531,7 +657,23 @@ def _run_qa(question: str, video_hint: str = "") -> str:
     if _is_recommendation_question(question):
         return _answer_recommendation_question(question, youtube_id)
 
-    docs = _match_documents(question, youtube_id=youtube_id, match_count=6)
+    # Paraphrases of a question already answered for this video skip
+    # retrieval and the LLM; the vector is reused for retrieval on a miss.
+    if query_embedding is None:
+        query_embedding = embed_question(question)
+    if QA_SEMANTIC_CACHE_ENABLED:
+        cached_answer = _QA_CACHE.lookup(query_embedding, scope=youtube_id)
+        if cached_answer is not None:
+            print("[QA] Semantic cache hit.")
+            return cached_answer
+
+    docs = _match_documents(
+        question,
+        youtube_id=youtube_id,
+        match_count=RETRIEVAL_CANDIDATES,
+        query_embedding=query_embedding,
+        rerank_top_k=QA_CONTEXT_CHUNKS,
+    )
 
     if (not docs) and youtube_id:
         print(
@@ -544,28 +686,16 @@ def _run_qa(question: str, video_hint: str = "") -> str:
         return "No matching chunks found in the knowledge base."
 
     context = "\n\n".join(
-        f"[Chunk {i}] {doc.get('content', '')}"
+        f"[Chunk {i}] {doc['content']}"
         for i, doc in enumerate(docs, start=1)
     )
 
-    prompt = f"""
-You are Evrika Briefs, an assistant that answers questions about YouTube videos
-using their transcript chunks.
+    prompt = QA_PROMPT_TEMPLATE.format(context=context, question=question)
 
-Use ONLY the information from the provided chunks to answer the question.
-If the answer is not clearly in the chunks, say that you are not sure.
-
-Relevant chunks:
-{context}
-
-User question:
-{question}
-
-Answer in a clear, concise way, 3–7 sentences maximum.
-""".strip()
-
-    response = llm.invoke(prompt)
-    return getattr(response, "content", str(response))
+    answer = cached_invoke(get_llm(), prompt)
+    if QA_SEMANTIC_CACHE_ENABLED:
+        _QA_CACHE.add(query_embedding, answer, scope=youtube_id)
+    return answer
 
 
 @tool
@@ -576,11 +706,17 @@ def video_chat(question: str, video_hint: str = "") -> str:
     return _run_qa(question, video_hint)
 
 
-def answer_question_text(question: str, video_hint: str = "") -> str:
+def answer_question_text(
+    question: str,
+    video_hint: str = "",
+    query_embedding: Optional[List[float]] = None,
+) -> str:
     """
     Plain helper for answering a question about the ingested videos (for HTTP APIs).
+
+    `query_embedding` is optional; pass it to reuse a precomputed question vector.
     """
-    return _run_qa(question, video_hint)
+    return _run_qa(question, video_hint, query_embedding=query_embedding)
 
 
 # ---------------------------------------------------------------------------
@@ -588,37 +724,7 @@ def answer_question_text(question: str, video_hint: str = "") -> str:
 # ---------------------------------------------------------------------------
 
 
-def generate_brief_text(video_hint: str) -> str:
-    """
-    Generate a structured Evrika Brief in Markdown for the given YouTube URL or ID.
-    """
-    youtube_id = extract_youtube_id(video_hint)
-    docs = _get_all_chunks_for_video(youtube_id)
-    if not docs:
-        ingest_youtube(video_hint)
-        docs = _get_all_chunks_for_video(youtube_id)
-        if not docs:
-            return "I could not find or ingest this video to generate a brief."
-
-    full_text = "\n\n".join(doc["content"] for doc in docs)
-
-    metadata_row = _fetch_metadata_row(youtube_id) or {}
-    view = _build_metadata_view(youtube_id, metadata_row)
-
-    video_title = view.get("title") or "(title unknown)"
-    video_url = view.get("url") or f"https://youtu.be/{youtube_id}"
-    channel = view.get("channel")
-    speaker = view.get("speaker")
-
-    if channel:
-        creator_line = f"- Creator / Channel: {channel}"
-    else:
-        creator_line = "- Creator / Channel: Unknown"
-
-    generated_at = datetime.now().strftime("%Y-%m-%d %H:%M")
-    generated_line = f"Generated: {generated_at}"
-
-    prompt = f"""
+BRIEF_SYSTEM_PROMPT = """
 You are Evrika Briefs, a tool that turns YouTube videos into smart 1-page briefs.
 
 You generate markdown that will be exported to PDF.
@@ -701,15 +807,51 @@ What is this really about? Why does it matter? Summarize in up to 5–8 short se
 
 Base your brief ONLY on the transcript text below.
 If you are unsure about specific names or numbers, be honest and approximate.
+""".strip()
 
-TRANSCRIPT:
-\"\"\"{full_text}\"\"\"
 
-Now write the Evrika Brief:
-""".strip()
+def generate_brief_text(video_hint: str) -> str:
+    """
+    Generate a structured Evrika Brief in Markdown for the given YouTube URL or ID.
+    """
+    youtube_id = extract_youtube_id(video_hint)
+    docs = _get_all_chunks_for_video(youtube_id)
+    if not docs:
+        ingest_youtube(video_hint)
+        docs = _get_all_chunks_for_video(youtube_id)
+        if not docs:
+            return "I could not find or ingest this video to generate a brief."
+
+    full_text = "\n\n".join(doc["content"] for doc in docs)
 
-    response = llm.invoke(prompt)
-    brief = getattr(response, "content", str(response))
+    metadata_row = video_cache.get_video(youtube_id) or {}
+    view = _build_metadata_view(youtube_id, metadata_row)
+
+    video_title = view.get("title") or "(title unknown)"
+    video_url = view.get("url") or f"https://youtu.be/{youtube_id}"
+    channel = view.get("channel")
+    speaker = view.get("speaker")
+
+    if channel:
+        creator_line = f"- Creator / Channel: {channel}"
+    else:
+        creator_line = "- Creator / Channel: Unknown"
+
+    generated_at = datetime.now().strftime("%Y-%m-%d %H:%M")
+    generated_line = f"Generated: {generated_at}"
+
+    # Static instructions + template go in the system message and only the
+    # transcript varies, so the provider's prompt cache can reuse the prefix.
+    messages = [
+        SystemMessage(content=BRIEF_SYSTEM_PROMPT),
+        HumanMessage(
+            content=f"TRANSCRIPT:\n\"\"\"{full_text}\"\"\"\n\nNow write the Evrika Brief:"
+        ),
+    ]
+
+    # The prompt has no timestamp (the Generated line is filled in below),
+    # so regenerating a brief for the same transcript hits the cache.
+    brief = cached_invoke(get_llm(), messages)
 
     # Post-process header, Generated line, Source, Creator
     if speaker:
@@ -760,9 +902,10 @@ def recommendations(video_hint: str, learning_goal: str = "") -> str:
     docs = _get_all_chunks_for_video(youtube_id)
     context = "\n\n".join(doc["content"] for doc in docs[:5])
 
-    prompt = f"""
-You are a learning coach inside Evrika Briefs.
-
+    messages = [
+        SystemMessage(content=RECOMMENDATION_SYSTEM_PROMPT),
+        HumanMessage(
+            content=f"""
 A user has just watched a YouTube video and ingested it into the system.
 They may have the following learning goal (optional):
 
@@ -770,17 +913,11 @@ Learning goal: {learning_goal or "(none given)"}
 
 Here are a few chunks from the video transcript for context:
 \"\"\"{context}\"\"\"
-
-Suggest 3–7 concrete follow-up learning steps, including:
-- Search queries they could type into YouTube or Google
-- Concrete topics or subskills to explore next
-- Optional: types of videos (tutorial, case study, lecture, etc.)
-
-Return the answer as a Markdown bullet list.
 """.strip()
+        ),
+    ]
 
-    response = llm.invoke(prompt)
-    return getattr(response, "content", str(response))
+    return cached_invoke(get_llm(), messages)
 
 
 # ---------------------------------------------------------------------------
@@ -790,24 +927,55 @@ Return the answer as a Markdown bullet list.
 def save_brief_as_pdf(brief_text: str, filename: str = "evrika_brief.pdf") -> str:
     """
     Turn a Markdown-ish Evrika Brief into a styled PDF and return the filename.
-
-    - Main title: font 18, bold, with proper line spacing.
-    - Section headings: font 14, bold, with extra space before/after.
-    - Body text & bullets: font 12, with comfortable line spacing.
-    - '---' becomes a visible horizontal line with padding.
-    - Inline **bold** is rendered in bold.
     """
     try:
-        from reportlab.lib.pagesizes import letter
-        from reportlab.pdfgen import canvas
+        _draw_brief_pdf(brief_text, filename)
     except ImportError:
         return (
             "The 'reportlab' package is not installed on the server environment. "
             "Install it with 'pip install reportlab' to generate PDFs."
         )
+    return filename
+
+
+def render_brief_pdf(brief_text: str) -> bytes:
+    """
+    Render a Markdown-ish Evrika Brief to PDF bytes in memory.
+
+    Used by the API so concurrent requests don't share (and overwrite)
+    a PDF file on disk.
+    """
+    buffer = io.BytesIO()
+    _draw_brief_pdf(brief_text, buffer)
+    return buffer.getvalue()
+
+
+# Characters a horizontal-rule line ("---", "–––", ...) may consist of
+_HR_CHARS = frozenset("-–—")
+
+
+def _draw_brief_pdf(brief_text: str, target: Any) -> None:
+    """
+    Draw the brief into `target` (a filename or a binary file-like object).
+
+    - Main title: font 18, bold, with proper line spacing.
+    - Section headings: font 14, bold, with extra space before/after.
+    - Body text & bullets: font 12, with comfortable line spacing.
+    - '---' becomes a visible horizontal line with padding.
+    - Inline **bold** is rendered in bold.
+
+    Raises ImportError if reportlab is not installed.
+    """
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    from reportlab.pdfgen import canvas
+
+    # Widths straight from the font metrics (no canvas round trip), cached
+    # because briefs repeat the same words many times.
+    string_width = functools.lru_cache(maxsize=4096)(stringWidth)
 
     # Create canvas
-    c = canvas.Canvas(filename, pagesize=letter)
+    c = canvas.Canvas(target, pagesize=letter)
     page_width, page_height = letter
 
     # Page margins
@@ -846,28 +1014,20 @@ def save_brief_as_pdf(brief_text: str, filename: str = "evrika_brief.pdf") -> st
 
         parts = line_text.split("**")
         # parts alternate: normal, bold, normal, bold, ...
+        # One text object: textOut advances the cursor itself, so no
+        # width measurements are needed while drawing.
+        text = c.beginText(margin_left, y_pos)
         is_bold = False
-        x = margin_left
 
         for part in parts:
-            if part == "":
-                # skip empty pieces (e.g. "****")
-                is_bold = not is_bold
-                continue
-
-            if is_bold:
-                # draw bold segment
-                c.setFont("Helvetica-Bold", font_size)
-                c.drawString(x, y_pos, part)
-                x += c.stringWidth(part, "Helvetica-Bold", font_size)
-            else:
-                # draw normal segment
-                c.setFont(font_name, font_size)
-                c.drawString(x, y_pos, part)
-                x += c.stringWidth(part, font_name, font_size)
-
+            if part:
+                text.setFont("Helvetica-Bold" if is_bold else font_name, font_size)
+                text.textOut(part)
+            # empty pieces (e.g. "****") only flip the state
             is_bold = not is_bold
 
+        c.drawText(text)
+
     def draw_wrapped(
         text: str,
         y_pos: float,
@@ -887,28 +1047,11 @@ def save_brief_as_pdf(brief_text: str, filename: str = "evrika_brief.pdf") -> st
         if not words:
             return y_pos
 
-        line = ""
         # Line height scales with font size → more space between title lines
         line_height = int(font_size * 1.4)
 
-        for word in words:
-            candidate = (line + " " + word).strip()
-            # Measure width ignoring bold; good enough for wrapping
-            if c.stringWidth(candidate, font_name, font_size) <= max_width:
-                line = candidate
-            else:
-                # Draw current line
-                if support_inline_bold:
-                    draw_line_with_bold(line, y_pos, font_name, font_size)
-                else:
-                    c.drawString(margin_left, y_pos, line)
-                y_pos -= line_height
-                if y_pos < bottom_margin:
-                    y_pos = new_page()
-                    c.setFont(font_name, font_size)
-                line = word
-
-        if line:
+        def flush(line_words: List[str], y_pos: float) -> float:
+            line = " ".join(line_words)
             if support_inline_bold:
                 draw_line_with_bold(line, y_pos, font_name, font_size)
             else:
@@ -917,6 +1060,39 @@ def save_brief_as_pdf(brief_text: str, filename: str = "evrika_brief.pdf") -> st
             if y_pos < bottom_margin:
                 y_pos = new_page()
                 c.setFont(font_name, font_size)
+            return y_pos
+
+        space_width = string_width(" ", font_name, font_size)
+        line_words: List[str] = []
+        line_width = 0.0
+        bold = False
+
+        for word in words:
+            if support_inline_bold and "**" in word:
+                # Measure **bold** pieces in the bold font, as they are drawn
+                word_width = 0.0
+                for i, part in enumerate(word.split("**")):
+                    if i:
+                        bold = not bold
+                    word_width += string_width(
+                        part, "Helvetica-Bold" if bold else font_name, font_size
+                    )
+            else:
+                word_width = string_width(
+                    word, "Helvetica-Bold" if bold else font_name, font_size
+                )
+
+            if not line_words:
+                line_words, line_width = [word], word_width
+            elif line_width + space_width + word_width <= max_width:
+                line_words.append(word)
+                line_width += space_width + word_width
+            else:
+                y_pos = flush(line_words, y_pos)
+                line_words, line_width = [word], word_width
+
+        if line_words:
+            y_pos = flush(line_words, y_pos)
 
         # Extra spacing after the whole block
         y_pos -= extra_space_after
@@ -924,98 +1100,112 @@ def save_brief_as_pdf(brief_text: str, filename: str = "evrika_brief.pdf") -> st
 
     first_header_done = False  # to detect main title
 
-    for raw_line in brief_text.split("\n"):
-        stripped = raw_line.strip()
+    def emit_hr(y_pos: float) -> float:
+        # space before line
+        y_pos -= base_line_height * 0.5
+        if y_pos < bottom_margin:
+            y_pos = new_page()
 
-        # Completely blank line → vertical space
-        if not stripped:
-            y -= base_line_height * 0.75
-            if y < bottom_margin:
-                y = new_page()
-            continue
+        # draw the line
+        c.line(margin_left, y_pos, page_width - margin_right, y_pos)
 
-        # Horizontal rule: a line that is only dashes (--- etc.)
-        if all(ch in "-–—" for ch in stripped) and len(stripped) >= 3:
-            # space before line
-            y -= base_line_height * 0.5
-            if y < bottom_margin:
-                y = new_page()
-
-            # draw the line
-            c.line(margin_left, y, page_width - margin_right, y)
-
-            # space after line
-            y -= base_line_height
-            if y < bottom_margin:
-                y = new_page()
-            continue
+        # space after line
+        y_pos -= base_line_height
+        if y_pos < bottom_margin:
+            y_pos = new_page()
+        return y_pos
 
+    def emit_heading(raw_line: str, stripped: str, y_pos: float) -> float:
         # Markdown headings: lines starting with '#'
-        if stripped.startswith("#"):
-            level = len(stripped) - len(stripped.lstrip("#"))
-            heading_text = stripped[level:].strip()
-
-            if not first_header_done:
-                # MAIN TITLE – font 18, bold, extra space after.
-                # Line spacing handled in draw_wrapped (font_size=18).
-                y = draw_wrapped(
-                    heading_text,
-                    y,
-                    font_name="Helvetica-Bold",
-                    font_size=18,
-                    extra_space_after=base_line_height * 1.0,
-                    support_inline_bold=False,
-                )
-                first_header_done = True
-            else:
-                # SECTION HEADINGS – font 14, bold, with space before/after
-                y -= base_line_height * 1.25
-                if y < bottom_margin:
-                    y = new_page()
-                y = draw_wrapped(
-                    heading_text,
-                    y,
-                    font_name="Helvetica-Bold",
-                    font_size=14,
-                    extra_space_after=base_line_height * 0.75,
-                    support_inline_bold=False,
-                )
-            continue
-
-        # "Generated: ..." line – smaller font, under title with gap after
-        if stripped.startswith("Generated:"):
-            y = draw_wrapped(
-                raw_line,
-                y,
-                font_name="Helvetica",
-                font_size=10,
+        nonlocal first_header_done
+        heading_text = stripped.lstrip("#").strip()
+
+        if not first_header_done:
+            # MAIN TITLE – font 18, bold, extra space after.
+            # Line spacing handled in draw_wrapped (font_size=18).
+            first_header_done = True
+            return draw_wrapped(
+                heading_text,
+                y_pos,
+                font_name="Helvetica-Bold",
+                font_size=18,
                 extra_space_after=base_line_height * 1.0,
                 support_inline_bold=False,
             )
-            continue
+
+        # SECTION HEADINGS – font 14, bold, with space before/after
+        y_pos -= base_line_height * 1.25
+        if y_pos < bottom_margin:
+            y_pos = new_page()
+        return draw_wrapped(
+            heading_text,
+            y_pos,
+            font_name="Helvetica-Bold",
+            font_size=14,
+            extra_space_after=base_line_height * 0.75,
+            support_inline_bold=False,
+        )
+
+    def emit_body(raw_line: str, stripped: str, y_pos: float) -> float:
+        # Normal paragraph text – body font 12, support bold
+        return draw_wrapped(
+            raw_line,
+            y_pos,
+            font_name="Helvetica",
+            font_size=12,
+            extra_space_after=base_line_height * 0.5,
+            support_inline_bold=True,
+        )
+
+    def emit_dash_line(raw_line: str, stripped: str, y_pos: float) -> float:
+        # Horizontal rule: a line that is only dashes (--- etc.)
+        if len(stripped) >= 3 and _HR_CHARS.issuperset(stripped):
+            return emit_hr(y_pos)
 
         # Bullet lines (start with "- ") – body font 12, support bold
         if stripped.startswith("- "):
-            y = draw_wrapped(
+            return draw_wrapped(
                 raw_line,
-                y,
+                y_pos,
                 font_name="Helvetica",
                 font_size=12,
                 extra_space_after=base_line_height * 0.3,
                 support_inline_bold=True,
             )
+        return emit_body(raw_line, stripped, y_pos)
+
+    def emit_g_line(raw_line: str, stripped: str, y_pos: float) -> float:
+        # "Generated: ..." line – smaller font, under title with gap after
+        if stripped.startswith("Generated:"):
+            return draw_wrapped(
+                raw_line,
+                y_pos,
+                font_name="Helvetica",
+                font_size=10,
+                extra_space_after=base_line_height * 1.0,
+                support_inline_bold=False,
+            )
+        return emit_body(raw_line, stripped, y_pos)
+
+    # One dict lookup on the first character picks the handler for a line
+    dispatch = {
+        "#": emit_heading,
+        "-": emit_dash_line,
+        "–": emit_dash_line,
+        "—": emit_dash_line,
+        "G": emit_g_line,
+    }
+
+    for raw_line in brief_text.split("\n"):
+        stripped = raw_line.strip()
+
+        # Completely blank line → vertical space
+        if not stripped:
+            y -= base_line_height * 0.75
+            if y < bottom_margin:
+                y = new_page()
             continue
 
-        # Normal paragraph text – body font 12, support bold
-        y = draw_wrapped(
-            raw_line,
-            y,
-            font_name="Helvetica",
-            font_size=12,
-            extra_space_after=base_line_height * 0.5,
-            support_inline_bold=True,
-        )
+        y = dispatch.get(stripped[0], emit_body)(raw_line, stripped, y)
 
     c.save()
-    return filename
-
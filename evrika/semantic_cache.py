@@ -0,0 +1,137 @@
+# evrika/semantic_cache.py
+"""
+Semantic (near-duplicate) cache for questions.
+
+A cached value is returned when a previous question in the same scope
+(usually the same youtube_id) has an embedding with cosine similarity
+>= SIMILARITY_THRESHOLD, so paraphrases like "What is 10x thinking?" and
+"what's 10x thinking" skip retrieval and the LLM call.
+
+Lookup uses random-projection LSH: every vector gets NUM_TABLES signatures
+of NUM_BITS sign bits each, and only entries sharing at least one
+signature are compared with an exact cosine check.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from .config import get_embeddings
+
+SIMILARITY_THRESHOLD = 0.95
+NUM_BITS = 16
+NUM_TABLES = 8
+MAX_ENTRIES = 2048
+
+
+def embed_question(question: str) -> List[float]:
+    """Embed a question with the shared embeddings model."""
+    return get_embeddings().embed_query(question)
+
+
+class SemanticCache:
+    """
+    Thread-safe, size-bounded semantic cache (oldest entries are evicted first).
+
+    Vectors are passed in by the caller, so a query embedding that is needed
+    for retrieval anyway can be reused for the cache lookup.
+    """
+
+    def __init__(
+        self,
+        threshold: float = SIMILARITY_THRESHOLD,
+        num_bits: int = NUM_BITS,
+        num_tables: int = NUM_TABLES,
+        max_entries: int = MAX_ENTRIES,
+        seed: int = 0,
+    ) -> None:
+        self.threshold = threshold
+        self.num_bits = num_bits
+        self.num_tables = num_tables
+        self.max_entries = max_entries
+        self._seed = seed
+
+        # Random hyperplanes, created on first use once the dimension is known
+        self._planes: Optional[np.ndarray] = None
+        self._bit_weights = 1 << np.arange(num_bits, dtype=np.int64)
+
+        # One dict per table: (scope, signature) -> entry ids
+        self._buckets: List[Dict[Tuple[Hashable, int], Set[int]]] = [
+            {} for _ in range(num_tables)
+        ]
+        # entry id -> (unit vector, value, scope, signatures)
+        self._entries: "OrderedDict[int, Tuple[np.ndarray, Any, Hashable, List[int]]]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def _unit(self, vector: Sequence[float]) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(v))
+        return v / norm if norm else v
+
+    def _signatures(self, v: np.ndarray) -> List[int]:
+        if self._planes is None:
+            rng = np.random.default_rng(self._seed)
+            self._planes = rng.standard_normal(
+                (self.num_tables, self.num_bits, v.shape[0])
+            ).astype(np.float32)
+        bits = (self._planes @ v) > 0  # (num_tables, num_bits)
+        return (bits.astype(np.int64) @ self._bit_weights).tolist()
+
+    def lookup(self, vector: Sequence[float], scope: Hashable = None) -> Optional[Any]:
+        """Return the cached value for the closest match in `scope`, or None."""
+        v = self._unit(vector)
+        with self._lock:
+            if not self._entries:
+                return None
+
+            sigs = self._signatures(v)
+            candidates: Set[int] = set()
+            for table, sig in zip(self._buckets, sigs):
+                candidates |= table.get((scope, sig), set())
+            if not candidates:
+                return None
+
+            ids = list(candidates)
+            matrix = np.stack([self._entries[i][0] for i in ids])
+            sims = matrix @ v
+            best = int(np.argmax(sims))
+            if sims[best] < self.threshold:
+                return None
+
+            entry_id = ids[best]
+            self._entries.move_to_end(entry_id)
+            return self._entries[entry_id][1]
+
+    def add(self, vector: Sequence[float], value: Any, scope: Hashable = None) -> None:
+        """Store `value` for this question vector in `scope`."""
+        v = self._unit(vector)
+        with self._lock:
+            sigs = self._signatures(v)
+            entry_id = self._next_id
+            self._next_id += 1
+
+            self._entries[entry_id] = (v, value, scope, sigs)
+            for table, sig in zip(self._buckets, sigs):
+                table.setdefault((scope, sig), set()).add(entry_id)
+
+            while len(self._entries) > self.max_entries:
+                self._evict_oldest()
+
+    def _evict_oldest(self) -> None:
+        old_id, (_, _, old_scope, old_sigs) = self._entries.popitem(last=False)
+        for table, sig in zip(self._buckets, old_sigs):
+            bucket = table.get((old_scope, sig))
+            if bucket is None:
+                continue
+            bucket.discard(old_id)
+            if not bucket:
+                del table[(old_scope, sig)]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            for table in self._buckets:
+                table.clear()
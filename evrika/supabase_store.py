@@ -3,12 +3,27 @@
 Helpers for storing and retrieving documents in Supabase (pgvector).
 """
 
-from typing import List
-from uuid import uuid4
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+from uuid import NAMESPACE_URL, UUID, uuid5
 
+import numpy as np
 from langchain_core.documents import Document
 
-from .config import supabase, embeddings
+from .config import get_supabase, get_embeddings
+
+# Optional: bulk-load chunks with COPY over a direct Postgres connection
+# (pip install "psycopg[binary]" pgvector, and set SUPABASE_DB_URL).
+try:
+    import psycopg
+    from pgvector import HalfVector
+    from pgvector.psycopg import register_vector
+    from psycopg.types.json import Jsonb
+except ImportError:
+    psycopg = None
 
 
 def get_existing_chunk_count(youtube_id: str) -> int:
@@ -18,13 +33,12 @@ def get_existing_chunk_count(youtube_id: str) -> int:
     """
     try:
         response = (
-            supabase.table("documents")
-            .select("id")
+            get_supabase().table("documents")
+            .select("id", count="exact", head=True)
             .eq("metadata->>youtube_id", youtube_id)
             .execute()
         )
-        data = response.data or []
-        count = len(data)
+        count = response.count or 0
         if count > 0:
             print(f"[INGEST] Found {count} existing chunks in Supabase for youtube_id={youtube_id}")
         return count
@@ -33,28 +47,228 @@ def get_existing_chunk_count(youtube_id: str) -> int:
         return 0
 
 
-def store_docs_in_supabase(docs: List[Document]) -> None:
+# Supabase Storage bucket holding the full yt-dlp info dict per video
+# ("raw_meta"), so the documents rows only carry a small reference.
+RAW_META_BUCKET = "raw_meta"
+
+
+def upload_raw_meta(youtube_id: str, raw_meta: Dict[str, Any]) -> Optional[str]:
     """
-    Store document chunks + embeddings in Supabase `documents` table.
-    Uses pgvector for the embedding column.
+    Upload raw_meta to Storage as raw_meta/{youtube_id}.json.
+
+    Returns the object path (bucket/name), or None if the upload failed.
     """
+    name = f"{youtube_id}.json"
+    try:
+        get_supabase().storage.from_(RAW_META_BUCKET).upload(
+            name,
+            json.dumps(raw_meta, default=str).encode("utf-8"),
+            {"content-type": "application/json", "upsert": "true"},
+        )
+    except Exception as e:
+        print(f"[SUPABASE] Warning: failed to upload raw_meta for {youtube_id}: {e}")
+        return None
+    return f"{RAW_META_BUCKET}/{name}"
+
+
+# -------- Embedding encodings --------
+
+# documents.embedding is halfvec(1536) (see the documents_embedding_halfvec
+# migration), so vectors are sent at float16 precision: fewer digits per
+# value in every insert body and match_documents call.
+
+
+def halfvec_literal(vector: List[float]) -> str:
+    """pgvector text form of `vector` rounded to float16, e.g. "[0.0123,-0.04]"."""
+    # str() of a float16 prints the shortest digits that round-trip at half precision
+    return "[" + ",".join(map(str, np.asarray(vector, dtype=np.float16))) + "]"
+
+
+# -------- Content-addressed row ids --------
+
+# A chunk's id is derived from its video and its text, so storing a chunk
+# that is already there (e.g. re-running an ingestion that failed halfway)
+# hits the existing row: it is filtered out before embedding, and if it
+# slips through anyway the insert skips it.
+
+# ids per `id IN (...)` lookup (they travel in the request URL)
+ID_LOOKUP_BATCH_SIZE = 200
+
+
+def document_id(content: str, metadata: Dict[str, Any]) -> str:
+    """Deterministic row id for a chunk of the video in metadata["youtube_id"]."""
+    digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    return str(uuid5(NAMESPACE_URL, f"{metadata.get('youtube_id', '')}:{digest}"))
+
+
+def existing_document_ids(ids: List[str]) -> Set[str]:
+    """The subset of ids that already have a row in `documents`."""
+    found: Set[str] = set()
+    for start in range(0, len(ids), ID_LOOKUP_BATCH_SIZE):
+        resp = (
+            get_supabase().table("documents")
+            .select("id")
+            .in_("id", ids[start : start + ID_LOOKUP_BATCH_SIZE])
+            .execute()
+        )
+        found.update(row["id"] for row in resp.data or [])
+    return found
+
+
+def pending_document_rows(
+    contents: List[str], metadatas: List[Dict[str, Any]]
+) -> List[Tuple[str, int]]:
+    """
+    (id, index) of every distinct row not yet stored, in input order.
+
+    Only these need embedding; a failed lookup means "store everything".
+    """
+    first_index: Dict[str, int] = {}
+    for i, (content, metadata) in enumerate(zip(contents, metadatas)):
+        first_index.setdefault(document_id(content, metadata), i)
+
     try:
-        texts = [d.page_content for d in docs]
-        vectors = embeddings.embed_documents(texts)
+        existing = existing_document_ids(list(first_index))
+    except Exception as e:
+        print(f"[SUPABASE] Warning: failed to look up existing chunk ids ({e}), storing all.")
+        existing = set()
+    if existing:
+        print(f"[SUPABASE] {len(existing)} of {len(first_index)} chunks already stored.")
+    return [(row_id, i) for row_id, i in first_index.items() if row_id not in existing]
+
+
+# -------- Bulk insert of chunk rows --------
+
+# Rows per PostgREST request (keeps bodies well under proxy/body limits),
+# and retry policy per request
+INSERT_BATCH_SIZE = 500
+INSERT_MAX_ATTEMPTS = 4
+INSERT_BACKOFF_SECONDS = 0.5
+
+_COPY_COLUMNS = "id, content, metadata, embedding"
 
-        rows = []
-        for doc, vec in zip(docs, vectors):
-            rows.append(
+
+def _copy_document_rows(
+    ids: List[str],
+    contents: List[str],
+    metadatas: List[Dict[str, Any]],
+    vectors: List[List[float]],
+) -> bool:
+    """
+    Stream rows into `documents` with binary COPY (vectors go over the wire
+    as float16, not JSON text). Returns False if psycopg / SUPABASE_DB_URL
+    are not available, so the caller can use PostgREST instead.
+
+    COPY can't skip conflicts, so rows land in a temp table first and are
+    moved over with ON CONFLICT (id) DO NOTHING.
+    """
+    dsn = os.getenv("SUPABASE_DB_URL")
+    if psycopg is None or not dsn:
+        return False
+
+    with psycopg.connect(dsn) as conn:
+        register_vector(conn)
+        with conn.cursor() as cur:
+            cur.execute(
+                "CREATE TEMP TABLE documents_load (LIKE documents INCLUDING DEFAULTS) "
+                "ON COMMIT DROP"
+            )
+            with cur.copy(
+                f"COPY documents_load ({_COPY_COLUMNS}) FROM STDIN WITH (FORMAT BINARY)"
+            ) as copy:
+                copy.set_types(["uuid", "text", "jsonb", "halfvec"])
+                for row_id, content, metadata, vector in zip(ids, contents, metadatas, vectors):
+                    copy.write_row(
+                        (
+                            UUID(row_id),
+                            content,
+                            Jsonb(metadata),
+                            HalfVector(np.asarray(vector, dtype=np.float16)),
+                        )
+                    )
+            cur.execute(
+                f"INSERT INTO documents ({_COPY_COLUMNS}) "
+                f"SELECT {_COPY_COLUMNS} FROM documents_load "
+                "ON CONFLICT (id) DO NOTHING"
+            )
+    return True
+
+
+def _upsert_with_backoff(rows: List[Dict[str, Any]]) -> None:
+    """Upsert one batch, retrying with exponential backoff on failure."""
+    for attempt in range(INSERT_MAX_ATTEMPTS):
+        try:
+            get_supabase().table("documents").upsert(
+                rows, on_conflict="id", ignore_duplicates=True
+            ).execute()
+            return
+        except Exception as e:
+            if attempt == INSERT_MAX_ATTEMPTS - 1:
+                raise
+            delay = INSERT_BACKOFF_SECONDS * 2**attempt
+            print(f"[SUPABASE] Insert batch failed ({e}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def insert_document_rows(
+    contents: List[str],
+    metadatas: List[Dict[str, Any]],
+    vectors: List[List[float]],
+    batch_size: int = INSERT_BATCH_SIZE,
+    ids: Optional[List[str]] = None,
+) -> int:
+    """
+    Insert chunk rows into `documents`: one COPY when a direct database
+    connection is configured, otherwise PostgREST upserts of batch_size rows.
+    Returns the number of rows sent; errors are raised.
+
+    Row ids are content-derived (document_id, unless `ids` are passed), so
+    a retried batch or an already-stored chunk doesn't create a duplicate.
+    """
+    if ids is None:
+        ids = [document_id(c, m) for c, m in zip(contents, metadatas)]
+    if _copy_document_rows(ids, contents, metadatas, vectors):
+        return len(contents)
+
+    for start in range(0, len(contents), batch_size):
+        end = start + batch_size
+        _upsert_with_backoff(
+            [
                 {
-                    "id": str(uuid4()),
-                    "content": doc.page_content,
-                    "metadata": doc.metadata,
-                    "embedding": vec,
+                    "id": row_id,
+                    "content": content,
+                    "metadata": metadata,
+                    "embedding": halfvec_literal(vector),
                 }
-            )
+                for row_id, content, metadata, vector in zip(
+                    ids[start:end], contents[start:end], metadatas[start:end], vectors[start:end]
+                )
+            ]
+        )
+    return len(contents)
+
+
+def store_docs_in_supabase(docs: List[Document]) -> None:
+    """
+    Store document chunks + embeddings in Supabase `documents` table.
+    Uses pgvector for the embedding column.
 
-        supabase.table("documents").insert(rows).execute()
-        print(f"[SUPABASE] Stored {len(rows)} chunks in 'documents' table.")
+    Docs that are already stored (same video, same text) are skipped
+    before embedding; get_embeddings() sends the rest in concurrent batches.
+    """
+    try:
+        pending = pending_document_rows(
+            [d.page_content for d in docs], [d.metadata for d in docs]
+        )
+        texts = [docs[i].page_content for _, i in pending]
+        vectors = get_embeddings().embed_documents(texts)
+        count = insert_document_rows(
+            texts,
+            [docs[i].metadata for _, i in pending],
+            vectors,
+            ids=[row_id for row_id, _ in pending],
+        )
+        print(f"[SUPABASE] Stored {count} chunks in 'documents' table.")
     except Exception as e:
         print(f"[SUPABASE] Warning: failed to store docs in Supabase: {e}")
 
@@ -65,12 +279,14 @@ def retrieve_docs_from_supabase(query: str, k: int = 10) -> List[Document]:
     Expects an RPC function `match_documents` in your database.
     """
     try:
-        embedding = embeddings.embed_query(query)
+        # get_embeddings() caches query vectors (memory + disk); collapsing
+        # whitespace lets re-asked questions with stray spaces hit that cache
+        embedding = get_embeddings().embed_query(" ".join(query.split()))
 
-        response = supabase.rpc(
+        response = get_supabase().rpc(
             "match_documents",
             {
-                "query_embedding": embedding,
+                "query_embedding": halfvec_literal(embedding),
                 "match_count": k,
             },
         ).execute()
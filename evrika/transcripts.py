@@ -3,13 +3,23 @@
 YouTube metadata, audio download, and transcript helpers.
 """
 
+import asyncio
+import functools
+import mimetypes
 import os
+import subprocess
+import threading
 from typing import List, Tuple, Optional
 
+import aiofiles
+from diskcache import Cache
+from openai import AsyncOpenAI
 from yt_dlp import YoutubeDL
-from pydub import AudioSegment
+from yt_dlp.utils import DownloadCancelled
 
-from .config import openai_client
+from .config import get_env, get_openai_client, run_sync
+from .embedding_cache import CACHE_DIR
+from .youtube_ids import extract_youtube_id
 
 # Try to import YouTubeTranscriptApi safely
 try:
@@ -35,26 +45,81 @@ except Exception as e:  # pragma: no cover
 # ---------------------------------------------------------------------------
 
 
+# Extracted metadata per video, on disk: re-ingesting or revisiting a URL
+# skips the extractor run (seconds of HTTP + page parsing).
+YTDLP_META_CACHE_DIR = os.path.join(CACHE_DIR, "ytdlp_meta")
+YTDLP_META_CACHE_SIZE_LIMIT = 100 * 1024 * 1024  # bytes on disk
+YTDLP_META_TTL_SECONDS = 3600
+
+
+@functools.cache
+def _get_metadata_disk_cache() -> Cache:
+    return Cache(YTDLP_META_CACHE_DIR, size_limit=YTDLP_META_CACHE_SIZE_LIMIT)
+
+
+def _metadata_cache_key(video_url: str) -> str:
+    # Keyed by video id, so different URL shapes of one video share an entry
+    try:
+        return extract_youtube_id(video_url.strip())
+    except ValueError:
+        return video_url.strip()
+
+
 def fetch_metadata_with_ytdlp(video_url: str) -> dict:
-    """Fetch video metadata (ID, title, etc.) without downloading media."""
+    """
+    Fetch video metadata (ID, title, etc.) without downloading media.
+
+    Results are cached on disk for YTDLP_META_TTL_SECONDS.
+    """
+    key = _metadata_cache_key(video_url)
+    try:
+        cached = _get_metadata_disk_cache().get(key)
+    except Exception as e:
+        print(f"[YTDLP] Warning: failed to read metadata cache: {e}")
+        cached = None
+    if cached is not None:
+        print(f"[YTDLP] Metadata cache hit for {key}.")
+        return cached
+
     ydl_opts = {"quiet": True, "skip_download": True}
     with YoutubeDL(ydl_opts) as ydl:
-        info = ydl.extract_info(video_url, download=False)
+        # sanitize_info makes the dict plain (picklable) data
+        info = ydl.sanitize_info(ydl.extract_info(video_url, download=False))
+
+    try:
+        _get_metadata_disk_cache().set(key, info, expire=YTDLP_META_TTL_SECONDS)
+    except Exception as e:
+        print(f"[YTDLP] Warning: failed to write metadata cache: {e}")
     return info
 
 
-def fetch_audio_with_ytdlp(video_url: str) -> Tuple[str, dict]:
+def fetch_audio_with_ytdlp(
+    video_url: str, cancel: Optional[threading.Event] = None
+) -> Tuple[str, dict]:
     """
     Download best audio from a YouTube URL as .mp3 and return:
     (audio_file_path, metadata_dict)
 
     We don't need studio-quality audio for transcription, so we keep the
     bitrate modest to reduce file size and speed up uploads.
+
+    If `cancel` is set while downloading, the download stops, its partial
+    file is removed and DownloadCancelled is raised.
     """
+    partial_files: List[str] = []
+
+    def check_cancel(progress: dict) -> None:
+        if cancel is not None and cancel.is_set():
+            partial_files.extend(
+                f for f in (progress.get("tmpfilename"), progress.get("filename")) if f
+            )
+            raise DownloadCancelled("audio download no longer needed")
+
     ydl_opts = {
         "format": "bestaudio/best",
         "quiet": True,
         "outtmpl": "%(id)s.%(ext)s",
+        "progress_hooks": [check_cancel],
         "postprocessors": [
             {
                 "key": "FFmpegExtractAudio",
@@ -63,9 +128,18 @@ def fetch_audio_with_ytdlp(video_url: str) -> Tuple[str, dict]:
             }
         ],
     }
-    with YoutubeDL(ydl_opts) as ydl:
-        info = ydl.extract_info(video_url, download=True)
-        audio_path = ydl.prepare_filename(info)
+    try:
+        with YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(video_url, download=True)
+            audio_path = ydl.prepare_filename(info)
+    except DownloadCancelled:
+        for partial in partial_files:
+            try:
+                os.remove(partial)
+            except OSError:
+                pass
+        print("[AUDIO] Download cancelled.")
+        raise
 
     # Ensure .mp3 extension
     if not audio_path.endswith(".mp3"):
@@ -111,13 +185,50 @@ def try_fetch_transcript_via_api(youtube_id: str) -> Optional[str]:
         return None
 
 
+def has_listed_captions(info: dict) -> bool:
+    """
+    Whether yt-dlp's metadata lists English subtitles or automatic captions,
+    i.e. whether try_fetch_transcript_via_api is likely to succeed.
+    """
+    for key in ("subtitles", "automatic_captions"):
+        if any(lang.startswith("en") for lang in (info.get(key) or {})):
+            return True
+    return False
+
+
 MAX_AUDIO_SIZE = 24 * 1024 * 1024  # 24 MB (OpenAI limit is ~25MB)
 
 
-def split_audio_if_needed(path: str) -> List[str]:
+def _probe_duration_seconds(path: str) -> float:
+    """Container duration of an audio file, via ffprobe (no decoding)."""
+    stat = os.stat(path)
+    return _probe_duration_cached(path, stat.st_size, stat.st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=128)
+def _probe_duration_cached(path: str, size: int, mtime_ns: int) -> float:
+    # size/mtime are part of the key so a re-downloaded file is probed again
+    result = subprocess.run(
+        [
+            "ffprobe", "-v", "quiet",
+            "-show_entries", "format=duration",
+            "-of", "csv=p=0",
+            path,
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return float(result.stdout.strip())
+
+
+def split_audio_if_needed(path: str, duration_s: Optional[float] = None) -> List[str]:
     """
     If the audio file is larger than MAX_AUDIO_SIZE, split it into multiple
     smaller files with approximately equal duration. Returns a list of paths.
+
+    Pass `duration_s` when it is already known (e.g. yt-dlp's "duration")
+    to skip probing the file.
     """
     size = os.path.getsize(path)
     if size <= MAX_AUDIO_SIZE:
@@ -125,42 +236,83 @@ def split_audio_if_needed(path: str) -> List[str]:
 
     print(f"[AUDIO] File {path} is {size} bytes, splitting into chunks...")
 
-    audio = AudioSegment.from_file(path)
-    duration_ms = len(audio)
+    # Cut with ffmpeg stream copy: no decode to PCM, no re-encode. The
+    # container duration from ffprobe gives the (approximately equal) cuts.
+    if not duration_s:
+        duration_s = _probe_duration_seconds(path)
     target_chunks = max(1, size // MAX_AUDIO_SIZE + 1)
-    chunk_duration_ms = duration_ms // target_chunks
+    chunk_duration_s = duration_s / target_chunks
 
     base, ext = os.path.splitext(path)
     ext = ext.lstrip(".")
 
     chunk_paths: List[str] = []
     for i in range(target_chunks):
-        start_ms = int(i * chunk_duration_ms)
-        end_ms = int(min((i + 1) * chunk_duration_ms, len(audio)))
-        chunk = audio[start_ms:end_ms]
         chunk_path = f"{base}_part{i}.{ext}"
-        chunk.export(chunk_path, format=ext)
+        cmd = ["ffmpeg", "-v", "error", "-y", "-ss", f"{i * chunk_duration_s:.3f}"]
+        if i < target_chunks - 1:
+            cmd += ["-t", f"{chunk_duration_s:.3f}"]
+        cmd += ["-i", path, "-c", "copy", chunk_path]
+        subprocess.run(cmd, check=True, capture_output=True)
         chunk_paths.append(chunk_path)
 
     print(f"[AUDIO] Created {len(chunk_paths)} chunks.")
     return chunk_paths
 
 
-def transcribe_with_whisper(path: str, model: str = "whisper-1") -> str:
+# Concurrent Whisper requests per transcription (OpenAI rate limits)
+WHISPER_CONCURRENCY = 4
+
+
+def _upload_file(audio_path: str, data: bytes) -> Tuple[str, bytes, str]:
+    """(filename, bytes, mime type) for an upload; Whisper detects the format by name."""
+    mime_type = mimetypes.guess_type(audio_path)[0] or "application/octet-stream"
+    return os.path.basename(audio_path), data, mime_type
+
+
+async def _atranscribe_parts(audio_paths: List[str], model: str) -> List[str]:
+    """Transcribe all parts concurrently; texts come back in part order."""
+    semaphore = asyncio.Semaphore(WHISPER_CONCURRENCY)
+
+    # A client per run: its connection pool belongs to this event loop
+    async with AsyncOpenAI(api_key=get_env("OPENAI_API_KEY")) as client:
+
+        async def transcribe_one(i: int, audio_path: str) -> str:
+            async with semaphore:
+                print(f"[WHISPER] Transcribing chunk {i + 1}/{len(audio_paths)}: {audio_path}")
+                async with aiofiles.open(audio_path, "rb") as f:
+                    data = await f.read()
+                transcript = await client.audio.transcriptions.create(
+                    model=model,
+                    file=_upload_file(audio_path, data),
+                )
+                return transcript.text
+
+        return await asyncio.gather(
+            *(transcribe_one(i, p) for i, p in enumerate(audio_paths))
+        )
+
+
+def transcribe_with_whisper(
+    path: str, model: str = "whisper-1", duration_s: Optional[float] = None
+) -> str:
     """
     Transcribe audio file with OpenAI Whisper.
-    If the file is too large, split it into chunks and transcribe each part.
+    If the file is too large, split it into chunks and transcribe the parts
+    concurrently (up to WHISPER_CONCURRENCY at a time).
     """
-    audio_paths = split_audio_if_needed(path)
-    texts: List[str] = []
-    for i, audio_path in enumerate(audio_paths):
-        print(f"[WHISPER] Transcribing chunk {i + 1}/{len(audio_paths)}: {audio_path}")
-        with open(audio_path, "rb") as f:
-            transcript = openai_client.audio.transcriptions.create(
-                model=model,
-                file=f,
+    audio_paths = split_audio_if_needed(path, duration_s)
+    if len(audio_paths) == 1:
+        # Common case: one request on the shared (HTTP/2) client, no event loop
+        with open(audio_paths[0], "rb") as f:
+            transcript = get_openai_client().audio.transcriptions.create(
+                model=model, file=_upload_file(audio_paths[0], f.read())
             )
-        texts.append(transcript.text)
+        texts = [transcript.text]
+    else:
+        # Parts are read with aiofiles, so the (up to 24 MB) reads don't
+        # block the loop the concurrent requests run on.
+        texts = run_sync(_atranscribe_parts(audio_paths, model))
 
     full_text = "\n\n".join(texts)
     print(f"[WHISPER] Done. Combined transcript length: {len(full_text)} characters")
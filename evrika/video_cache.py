@@ -0,0 +1,178 @@
+# evrika/video_cache.py
+"""
+Cached reads of the `videos` table (one row per ingested video).
+
+The metadata tools, metadata questions, briefs and ingestion all read
+rows through here, so there is one cache to prime or invalidate when a
+video is (re-)ingested.
+"""
+
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+from cachetools import TTLCache
+
+from . import config
+
+
+# -------- Row cache --------
+
+# Agent sessions, metadata questions and briefs ask about the same video
+# over and over; keep its row for a few minutes instead of hitting
+# Supabase each time.
+METADATA_CACHE_SIZE = 512
+METADATA_CACHE_TTL_SECONDS = 300
+
+_METADATA_CACHE: TTLCache = TTLCache(
+    maxsize=METADATA_CACHE_SIZE, ttl=METADATA_CACHE_TTL_SECONDS
+)
+
+# Videos Supabase has no row for (typo, deleted video) are remembered for a
+# short window, so an agent retrying the same bad id doesn't re-query each
+# time. Kept short (and cleared by prime/invalidate) so a freshly ingested
+# video shows up quickly.
+METADATA_MISS_TTL_SECONDS = 30
+_MISS = object()
+
+_METADATA_MISS_CACHE: TTLCache = TTLCache(
+    maxsize=METADATA_CACHE_SIZE, ttl=METADATA_MISS_TTL_SECONDS
+)
+_METADATA_CACHE_LOCK = threading.Lock()
+
+
+def invalidate(youtube_id: str) -> None:
+    """Drop the cached metadata for a video (call after (re-)ingesting it)."""
+    with _METADATA_CACHE_LOCK:
+        _METADATA_CACHE.pop(youtube_id, None)
+        _METADATA_MISS_CACHE.pop(youtube_id, None)
+
+
+def prime(youtube_id: str, meta_view: Dict[str, Any]) -> None:
+    """
+    Put an already-known row in the cache (e.g. right after ingestion).
+
+    `meta_view` must have the same keys as a `videos` row.
+    """
+    with _METADATA_CACHE_LOCK:
+        _METADATA_CACHE[youtube_id] = meta_view
+        _METADATA_MISS_CACHE.pop(youtube_id, None)
+
+
+# -------- Single-flight --------
+
+# youtube_id -> Future of the Supabase load currently running for it.
+# Concurrent callers (parallel tool calls, concurrent requests) asking for
+# a video that is already being loaded wait for that load instead of
+# issuing their own query. Guarded by _METADATA_CACHE_LOCK, together with
+# the cache, so a video is always either cached, in flight, or claimable.
+_INFLIGHT: Dict[str, "Future[Optional[Dict[str, Any]]]"] = {}
+
+
+def _claim_views(
+    youtube_ids: List[str],
+) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Future], Dict[str, Future]]:
+    """
+    Split youtube_ids into:
+      - cached views (known-missing videos are left out entirely),
+      - ids this caller must load (with the Futures it must settle),
+      - ids another caller is already loading (Futures to wait on).
+    """
+    found: Dict[str, Dict[str, Any]] = {}
+    mine: Dict[str, Future] = {}
+    theirs: Dict[str, Future] = {}
+    with _METADATA_CACHE_LOCK:
+        for youtube_id in youtube_ids:
+            meta_view = _METADATA_CACHE.get(youtube_id)
+            if meta_view is not None:
+                found[youtube_id] = meta_view
+            elif _METADATA_MISS_CACHE.get(youtube_id) is _MISS:
+                continue
+            elif youtube_id in _INFLIGHT:
+                theirs[youtube_id] = _INFLIGHT[youtube_id]
+            else:
+                mine[youtube_id] = _INFLIGHT[youtube_id] = Future()
+    return found, mine, theirs
+
+
+def _settle(
+    mine: Dict[str, Future],
+    loaded: Dict[str, Dict[str, Any]],
+    error: Optional[BaseException] = None,
+) -> None:
+    """Cache what was loaded and wake up everyone waiting on `mine`."""
+    with _METADATA_CACHE_LOCK:
+        for youtube_id in mine:
+            _INFLIGHT.pop(youtube_id, None)
+            if youtube_id in loaded:
+                _METADATA_CACHE[youtube_id] = loaded[youtube_id]
+            elif error is None:
+                _METADATA_MISS_CACHE[youtube_id] = _MISS
+
+    for youtube_id, future in mine.items():
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(loaded.get(youtube_id))
+
+
+def get_video(youtube_id: str) -> Optional[Dict[str, Any]]:
+    """
+    The `videos` row for youtube_id (None if unknown), served from the TTL
+    cache when possible.
+    """
+    return get_videos([youtube_id]).get(youtube_id)
+
+
+def get_videos(youtube_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    `videos` rows for several videos: youtube_id -> row.
+
+    Cached videos are served from the TTL cache; videos another caller is
+    already loading are awaited; all others are loaded in ONE Supabase
+    request. Unknown videos are simply missing from the result.
+    """
+    found, mine, theirs = _claim_views(youtube_ids)
+    if mine:
+        try:
+            loaded = _rows_by_id(
+                _videos_query(config.get_supabase(), list(mine)).execute()
+            )
+        except BaseException as e:
+            _settle(mine, {}, e)
+            raise
+        _settle(mine, loaded)
+        found.update(loaded)
+
+    for youtube_id, future in theirs.items():
+        meta_view = future.result()
+        if meta_view is not None:
+            found[youtube_id] = meta_view
+    return found
+
+
+# Columns of the `videos` table (one row per video, upserted at ingestion;
+# see supabase/migrations). The fallbacks (raw_meta title, uploader as
+# channel, upload_date formatting) are already resolved there, so rows are
+# used as-is.
+_VIDEO_COLUMNS = "youtube_id,title,url,channel,speaker,duration_seconds,published_at"
+
+
+def _videos_query(client: Any, youtube_ids: List[str]) -> Any:
+    """
+    Build the 'videos' query for youtube_ids.
+    """
+    query = client.table("videos").select(_VIDEO_COLUMNS)
+    if len(youtube_ids) == 1:
+        # Single primary-key lookup
+        return query.eq("youtube_id", youtube_ids[0]).maybe_single()
+    return query.in_("youtube_id", youtube_ids)
+
+
+def _rows_by_id(resp: Any) -> Dict[str, Dict[str, Any]]:
+    # maybe_single() yields no response (or no data) when the video is unknown
+    data = resp.data if resp is not None else None
+    if not data:
+        return {}
+    rows = data if isinstance(data, list) else [data]
+    return {row["youtube_id"]: row for row in rows}
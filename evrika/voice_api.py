@@ -6,26 +6,37 @@ Run locally with:
     uvicorn evrika.voice_api:app --reload --port 8000
 """
 
+import asyncio
 import base64
+import io
+import os
 import re
+import threading
+from typing import Optional
+from uuid import uuid4
 
-from fastapi import FastAPI, UploadFile, File, Form
+from cachetools import TTLCache
+from fastapi import FastAPI, HTTPException, Request, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 
+from .config import bind_current_video, warm_up_clients
 from .audio_utils import transcribe_question_bytes, synthesize_answer_tts
 from .rag_pipeline import (
     answer_question_text,
     ingest_youtube,
     generate_brief_text,
-    save_brief_as_pdf,
+    render_brief_pdf,
+    warm_up_reranker,
 )
 
 app = FastAPI(
     title="Evrika Voice API",
     description="Text and voice endpoints for Evrika Briefs Q&A",
     version="0.1.0",
+    # orjson: the large string fields (base64 audio, briefs) serialize in C
+    default_response_class=ORJSONResponse,
 )
 
 # ---------------------------------------------------------------------------
@@ -34,24 +45,51 @@ app = FastAPI(
 
 # Lovable sends a custom header: ngrok-skip-browser-warning
 # We allow it explicitly and support OPTIONS preflight.
+#
+# Behind a reverse proxy that answers CORS itself (deploy/nginx/evrika.conf
+# replies to preflights without reaching uvicorn), set EVRIKA_CORS_AT_PROXY=1
+# and the middleware is left out. Browsers cache preflight answers for
+# CORS_MAX_AGE_SECONDS either way.
+
+CORS_ALLOW_HEADERS = [
+    "Content-Type",
+    "ngrok-skip-browser-warning",
+    "Authorization",
+    "Accept",
+    "Origin",
+    "User-Agent",
+    "DNT",
+    "Cache-Control",
+    "X-Requested-With",
+    "X-Youtube-Id",
+]
+CORS_EXPOSE_HEADERS = ["X-Youtube-Id"]
+CORS_MAX_AGE_SECONDS = 86400
+
+if not os.getenv("EVRIKA_CORS_AT_PROXY"):
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # later: restrict to your Lovable domain
+        allow_credentials=False,
+        allow_methods=["GET", "POST", "OPTIONS"],
+        allow_headers=CORS_ALLOW_HEADERS,
+        expose_headers=CORS_EXPOSE_HEADERS,
+        max_age=CORS_MAX_AGE_SECONDS,
+    )
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # later: restrict to your Lovable domain
-    allow_credentials=False,
-    allow_methods=["GET", "POST", "OPTIONS"],
-    allow_headers=[
-        "Content-Type",
-        "ngrok-skip-browser-warning",
-        "Authorization",
-        "Accept",
-        "Origin",
-        "User-Agent",
-        "DNT",
-        "Cache-Control",
-        "X-Requested-With",
-    ],
-)
+
+# Per-request 'current' video (X-Youtube-Id header in and out)
+app.middleware("http")(bind_current_video)
+
+
+@app.on_event("startup")
+async def _warm_up() -> None:
+    """
+    Pre-open OpenAI + Supabase connections and load the reranker, so the
+    first user doesn't pay for them.
+    """
+    await asyncio.to_thread(warm_up_clients)
+    await asyncio.to_thread(warm_up_reranker)
 
 # ---------------------------------------------------------------------------
 # HEALTH CHECK
@@ -68,11 +106,16 @@ async def health():
 # ---------------------------------------------------------------------------
 
 # YouTube URL detector: youtube.com/watch?v=... or youtu.be/...
+# (the alternation only covers the fixed prefix; the id part is shared)
 YOUTUBE_URL_RE = re.compile(
-    r"(https?://(?:www\.)?(?:youtube\.com/watch\?v=[\w\-]+|youtu\.be/[\w\-]+)[^\s]*)",
+    r"(https?://(?:www\.)?(?:youtube\.com/watch\?v=|youtu\.be/)[\w\-]+[^\s]*)",
     re.IGNORECASE,
 )
 
+# Lovable-style "[Video URL: ...]" marker. The URL can't contain "]" or a
+# newline, which keeps matching linear on long user prompts.
+VIDEO_URL_BRACKET_RE = re.compile(r"\[Video URL:\s*([^\]\n]+?)\s*\]", re.IGNORECASE)
+
 
 def _parse_ingestion_url_from_prompt(prompt: str) -> str | None:
     """
@@ -83,11 +126,8 @@ def _parse_ingestion_url_from_prompt(prompt: str) -> str | None:
       (case-insensitive).
     - Then, extract a YouTube URL from anywhere in the prompt.
     """
-    lines = [ln.strip() for ln in prompt.splitlines() if ln.strip()]
-    if not lines:
-        return None
-
-    last_line = lines[-1].lower()
+    # Only the tail matters: no need to split/strip every line of the prompt
+    last_line = prompt.rstrip().rsplit("\n", 1)[-1].strip().lower()
     if not last_line.startswith("fetch this video"):
         # Treat as normal chat, even if the prompt contains a YouTube URL.
         return None
@@ -95,7 +135,7 @@ def _parse_ingestion_url_from_prompt(prompt: str) -> str | None:
     # We *know* this is an ingestion request. Now find the URL anywhere.
 
     # Try [Video URL: ...] pattern first (Lovable style)
-    m_bracket = re.search(r"\[Video URL:\s*(.+?)\s*\]", prompt, re.IGNORECASE)
+    m_bracket = VIDEO_URL_BRACKET_RE.search(prompt)
     if m_bracket:
         return m_bracket.group(1).strip()
 
@@ -115,7 +155,7 @@ def _extract_video_hint_url(prompt: str) -> str | None:
     Any prompt that includes a YouTube URL will use that as video_hint.
     """
     # Prefer [Video URL: ...] if present
-    m_bracket = re.search(r"\[Video URL:\s*(.+?)\s*\]", prompt, re.IGNORECASE)
+    m_bracket = VIDEO_URL_BRACKET_RE.search(prompt)
     if m_bracket:
         return m_bracket.group(1).strip()
 
@@ -247,12 +287,20 @@ async def create_brief_pdf(req: BriefPdfRequest):
     and return a generated PDF.
     """
     print("[BRIEF] JSON PDF request")
-    filename = "evrika_brief.pdf"
-    save_brief_as_pdf(req.brief_markdown, filename)
-    return FileResponse(
-        filename,
+    try:
+        pdf_bytes = await asyncio.to_thread(render_brief_pdf, req.brief_markdown)
+    except ImportError:
+        raise HTTPException(
+            status_code=503,
+            detail="PDF export is unavailable: reportlab is not installed on the server.",
+        )
+    except Exception as e:
+        print(f"[BRIEF][PDF ERROR] {e}")
+        raise HTTPException(status_code=500, detail=f"Could not render the PDF: {e}")
+    return StreamingResponse(
+        io.BytesIO(pdf_bytes),
         media_type="application/pdf",
-        filename=filename,
+        headers={"Content-Disposition": 'attachment; filename="evrika_brief.pdf"'},
     )
 
 
@@ -260,9 +308,51 @@ async def create_brief_pdf(req: BriefPdfRequest):
 # VOICE ENDPOINT
 # ---------------------------------------------------------------------------
 
+# Answer audio kept for a follow-up GET /voice-query/audio/{audio_id}, for
+# clients that want raw bytes instead of base64 in the JSON. The store is
+# bounded by total audio bytes (oldest answers are evicted first).
+#
+# It lives in this process's memory: run a single uvicorn worker / replica
+# (or route a client's requests to the same one), otherwise the GET can
+# land on a process that doesn't have the audio and returns 404.
+VOICE_AUDIO_TTL_SECONDS = 300
+VOICE_AUDIO_MAX_BYTES = 32 * 1024 * 1024
+
+_VOICE_AUDIO: TTLCache = TTLCache(
+    maxsize=VOICE_AUDIO_MAX_BYTES,
+    ttl=VOICE_AUDIO_TTL_SECONDS,
+    getsizeof=lambda stored: len(stored[0]),
+)
+_VOICE_AUDIO_LOCK = threading.Lock()
+
+
+def _keep_voice_audio(audio_bytes: bytes, mime_type: str) -> Optional[str]:
+    """Store answer audio for GET /voice-query/audio; None if it can't fit."""
+    audio_id = uuid4().hex
+    try:
+        with _VOICE_AUDIO_LOCK:
+            _VOICE_AUDIO[audio_id] = (audio_bytes, mime_type)
+    except ValueError:
+        # Larger than the whole store
+        return None
+    return audio_id
+
+
+@app.get("/voice-query/audio/{audio_id}")
+async def voice_query_audio(audio_id: str):
+    """Raw TTS audio of an earlier /voice-query answer."""
+    with _VOICE_AUDIO_LOCK:
+        stored = _VOICE_AUDIO.get(audio_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Audio not found or expired")
+    audio_bytes, mime_type = stored
+    return Response(content=audio_bytes, media_type=mime_type)
+
+
 
 @app.post("/voice-query")
 async def voice_query(
+    request: Request,
     file: UploadFile = File(...),
     video_hint: str = Form("", description="Optional YouTube URL or ID"),
 ):
@@ -274,6 +364,11 @@ async def voice_query(
     3. Runs RAG to get an answer.
     4. Tries to synthesize TTS audio for the answer (best-effort).
     5. Returns text + optional base64-encoded audio.
+
+    Clients that send `Accept: audio/*` get `audio_url` instead of
+    `audio_base64`: a GET on it returns the raw audio (kept in this
+    process for VOICE_AUDIO_TTL_SECONDS). The text always stays in the
+    JSON body.
     """
     # 1. Read raw audio bytes
     try:
@@ -317,19 +412,29 @@ async def voice_query(
 
     # 4. TTS – answer -> audio (best-effort; failure should NOT 500)
     audio_base64: str | None = None
+    audio_url: str | None = None
     audio_mime: str | None = None
     try:
         answer_audio_bytes, answer_mime_type = synthesize_answer_tts(answer_text)
-        audio_base64 = base64.b64encode(answer_audio_bytes).decode("utf-8")
+        audio_id = None
+        if "audio/" in request.headers.get("accept", ""):
+            audio_id = _keep_voice_audio(answer_audio_bytes, answer_mime_type)
+        if audio_id is not None:
+            audio_url = str(request.url_for("voice_query_audio", audio_id=audio_id))
+        else:
+            audio_base64 = base64.b64encode(answer_audio_bytes).decode("utf-8")
         audio_mime = answer_mime_type
     except Exception as e:
         # Just log; we still return a valid JSON with text answer
         print(f"[VOICE][TTS ERROR] {e}")
 
     # 5. Return everything
-    return {
+    response = {
         "question": question_text,
         "answer": answer_text,
         "audio_base64": audio_base64,
         "audio_mime": audio_mime,
     }
+    if audio_url is not None:
+        response["audio_url"] = audio_url
+    return response
@@ -0,0 +1,61 @@
+# evrika/youtube_ids.py
+"""
+Parsing YouTube video ids out of URLs and hints.
+
+Kept free of other evrika imports so every module (transcripts, the RAG
+pipeline, the tools) can use the same parser without import cycles.
+"""
+
+import functools
+import re
+from urllib.parse import urlparse, parse_qs
+
+
+# watch?v=<id>, youtu.be/<id>, /shorts/<id>, /embed/<id>, /live/<id>
+_YOUTUBE_ID_RE = re.compile(
+    r"(?:[?&]v=|youtu\.be/|/shorts/|/embed/|/live/)([A-Za-z0-9_-]{11})(?![A-Za-z0-9_-])"
+)
+
+
+@functools.lru_cache(maxsize=1024)
+def extract_youtube_id(url_or_id: str) -> str:
+    """
+    Extract a YouTube video ID from either:
+    - a plain 11-character ID
+    - a full YouTube URL
+    - a youtu.be short URL
+
+    Results are memoized: the same hint is usually resolved on every turn.
+    Raises ValueError if no ID can be extracted.
+    """
+    if not url_or_id:
+        raise ValueError("Empty YouTube URL/ID")
+
+    # If it looks like a bare ID (11 chars, no slash), accept it
+    if len(url_or_id) == 11 and "/" not in url_or_id and "?" not in url_or_id:
+        return url_or_id
+
+    # Fast path for the common URL shapes; exotic ones go through urlparse
+    match = _YOUTUBE_ID_RE.search(url_or_id)
+    if match:
+        return match.group(1)
+
+    parsed = urlparse(url_or_id)
+
+    # youtu.be/<id>
+    if parsed.hostname in {"youtu.be"}:
+        vid = parsed.path.lstrip("/")
+        if vid:
+            return vid
+
+    # youtube.com/watch?v=<id>
+    qs = parse_qs(parsed.query)
+    if "v" in qs and qs["v"]:
+        return qs["v"][0]
+
+    # Fallback: last path segment
+    path_parts = [p for p in parsed.path.split("/") if p]
+    if path_parts:
+        return path_parts[-1]
+
+    raise ValueError(f"Could not extract YouTube ID from: {url_or_id}")
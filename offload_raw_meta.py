@@ -0,0 +1,53 @@
+# offload_raw_meta.py
+"""
+One-off backfill: move metadata.raw_meta of already ingested videos to
+Supabase Storage (bucket `raw_meta`, object {youtube_id}.json) and strip
+it from the documents rows.
+
+Run after applying the offload_raw_meta migration:
+    python offload_raw_meta.py
+
+Safe to re-run: videos whose rows no longer carry raw_meta are skipped.
+"""
+
+from evrika.config import get_supabase
+from evrika.supabase_store import upload_raw_meta
+
+
+def main() -> None:
+    supabase = get_supabase()
+
+    videos = supabase.table("videos").select("youtube_id").execute().data or []
+    print(f"[OFFLOAD] Checking {len(videos)} videos...")
+
+    offloaded = 0
+    for video in videos:
+        youtube_id = video["youtube_id"]
+
+        resp = (
+            supabase.table("documents")
+            .select("raw_meta:metadata->raw_meta")
+            .eq("metadata->>youtube_id", youtube_id)
+            .not_.is_("metadata->raw_meta", "null")
+            .limit(1)
+            .maybe_single()
+            .execute()
+        )
+        row = resp.data if resp is not None else None
+        if not row or not row.get("raw_meta"):
+            continue
+
+        if upload_raw_meta(youtube_id, row["raw_meta"]) is None:
+            continue
+
+        stripped = supabase.rpc(
+            "strip_offloaded_raw_meta", {"p_youtube_id": youtube_id}
+        ).execute().data
+        print(f"[OFFLOAD] {youtube_id}: uploaded, stripped {stripped} rows")
+        offloaded += 1
+
+    print(f"[OFFLOAD] Done. Offloaded raw_meta for {offloaded} videos.")
+
+
+if __name__ == "__main__":
+    main()
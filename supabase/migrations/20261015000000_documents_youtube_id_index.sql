@@ -0,0 +1,14 @@
+-- Index the youtube_id stored in documents.metadata.
+--
+-- Every per-video lookup (existing chunk count, metadata row, all chunks
+-- for a video) filters on metadata->>'youtube_id'. Without an index each
+-- one is a sequential scan over all chunks of all videos. A btree on the
+-- extracted text is smaller than a jsonb_path_ops GIN and is exactly what
+-- the `.eq("metadata->>youtube_id", ...)` filters compile to.
+--
+-- Migrations run inside a transaction, so CONCURRENTLY is not used here.
+-- On a large live table, run this statement by hand first with
+-- CREATE INDEX CONCURRENTLY; the IF NOT EXISTS then makes this a no-op.
+
+create index if not exists idx_documents_youtube_id
+    on public.documents ((metadata->>'youtube_id'));
@@ -0,0 +1,110 @@
+-- Video-level metadata, one row per video.
+--
+-- documents holds one row per chunk and every chunk repeats the same
+-- video metadata (including the large yt-dlp raw_meta blob). Metadata
+-- reads used to pick "any one chunk" of the video from that wide table;
+-- with this table they are a primary-key lookup on a narrow row.
+--
+-- The title / channel / uploader / upload_date fallbacks that the Python
+-- read path applied on every request are resolved once, at write time,
+-- by video_from_metadata().
+
+create table if not exists public.videos (
+    youtube_id       text primary key,
+    title            text,
+    url              text,
+    channel          text,
+    speaker          text,
+    duration_seconds double precision,
+    published_at     text
+);
+
+
+-- Derive a videos row from one chunk's metadata JSONB.
+create or replace function public.video_from_metadata(m jsonb)
+returns public.videos
+language sql
+immutable
+as $$
+    select
+        m->>'youtube_id',
+        coalesce(nullif(m->>'title', ''), nullif(raw->>'title', '')),
+        coalesce(nullif(m->>'url', ''), nullif(raw->>'webpage_url', '')),
+        ch.channel,
+        coalesce(nullif(m->>'speaker', ''), nullif(raw->>'speaker', ''), nullif(raw->>'artist', '')),
+        coalesce(
+            case when jsonb_typeof(m->'duration_seconds') = 'number'
+                 then (m->>'duration_seconds')::double precision end,
+            case when jsonb_typeof(raw->'duration') = 'number'
+                 then (raw->>'duration')::double precision end
+        ),
+        coalesce(
+            nullif(m->>'published_at', ''),
+            case when upload_date ~ '^[0-9]{8}$'
+                 then substr(upload_date, 1, 4) || '-' || substr(upload_date, 5, 2)
+                      || '-' || substr(upload_date, 7, 2)
+                 else upload_date end
+        )
+    from (
+        select
+            coalesce(m->'raw_meta', '{}'::jsonb) as raw,
+            coalesce(
+                nullif(m->>'upload_date', ''),
+                nullif(m->'raw_meta'->>'upload_date', '')
+            ) as upload_date
+    ) r,
+    lateral (
+        select coalesce(
+            nullif(m->>'channel', ''),
+            nullif(raw->>'channel', ''),
+            nullif(raw->>'uploader', '')
+        ) as channel
+    ) ch
+$$;
+
+
+-- Backfill: one (arbitrary but deterministic) chunk per video.
+insert into public.videos
+select (public.video_from_metadata(d.metadata)).*
+from (
+    select distinct on (metadata->>'youtube_id') metadata
+    from public.documents
+    where metadata->>'youtube_id' is not null
+    order by metadata->>'youtube_id', id
+) d
+on conflict (youtube_id) do nothing;
+
+
+-- Keep videos in sync with ingestion. Statement-level with a transition
+-- table: an ingest inserts all chunks of a video in one statement, so
+-- this runs once per ingest instead of once per chunk.
+create or replace function public.sync_videos_from_documents()
+returns trigger
+language plpgsql
+as $$
+begin
+    insert into public.videos
+    select (public.video_from_metadata(n.metadata)).*
+    from (
+        select distinct on (metadata->>'youtube_id') metadata
+        from new_rows
+        where metadata->>'youtube_id' is not null
+        order by metadata->>'youtube_id'
+    ) n
+    on conflict (youtube_id) do update set
+        title            = excluded.title,
+        url              = excluded.url,
+        channel          = excluded.channel,
+        speaker          = excluded.speaker,
+        duration_seconds = excluded.duration_seconds,
+        published_at     = excluded.published_at;
+    return null;
+end;
+$$;
+
+drop trigger if exists documents_sync_videos on public.documents;
+create trigger documents_sync_videos
+    after insert on public.documents
+    referencing new table as new_rows
+    for each statement
+    execute function public.sync_videos_from_documents();
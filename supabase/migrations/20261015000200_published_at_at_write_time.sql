@@ -0,0 +1,124 @@
+-- Compute published_at once, at write time, instead of on every read.
+--
+-- yt-dlp gives upload_date as 'YYYYMMDD'. The read paths used to turn it
+-- into 'YYYY-MM-DD' on each metadata request; after this migration
+--   * videos.published_at is a DATE generated from videos.upload_date;
+--   * every documents row carries metadata.published_at (ingestion already
+--     writes it; older rows are backfilled here).
+--
+-- Generated columns need an immutable expression, so make_date() is used
+-- (to_date() is only stable) behind a YYYYMMDD format guard.
+
+
+-- 1) documents: backfill metadata.published_at where it is missing
+update public.documents d
+set metadata = d.metadata || jsonb_build_object(
+        'published_at',
+        substr(u.upload_date, 1, 4) || '-' || substr(u.upload_date, 5, 2)
+            || '-' || substr(u.upload_date, 7, 2)
+    )
+from (
+    select
+        id,
+        coalesce(
+            nullif(metadata->>'upload_date', ''),
+            nullif(metadata->'raw_meta'->>'upload_date', '')
+        ) as upload_date
+    from public.documents
+    where coalesce(metadata->>'published_at', '') = ''
+) u
+where d.id = u.id
+  and u.upload_date ~ '^[0-9]{8}$';
+
+
+-- 2) videos: keep the raw upload_date, generate published_at from it
+drop function if exists public.video_from_metadata(jsonb);
+
+alter table public.videos add column if not exists upload_date text;
+
+update public.videos
+set upload_date = replace(published_at, '-', '')
+where upload_date is null
+  and published_at ~ '^[0-9]{4}-?[0-9]{2}-?[0-9]{2}$';
+
+alter table public.videos drop column if exists published_at;
+
+alter table public.videos
+    add column published_at date generated always as (
+        case when upload_date ~ '^[0-9]{8}$'
+             then make_date(
+                 substr(upload_date, 1, 4)::int,
+                 substr(upload_date, 5, 2)::int,
+                 substr(upload_date, 7, 2)::int
+             )
+        end
+    ) stored;
+
+
+-- 3) Same derivation as before, but emit upload_date (published_at is generated)
+create function public.video_from_metadata(m jsonb)
+returns table (
+    youtube_id       text,
+    title            text,
+    url              text,
+    channel          text,
+    speaker          text,
+    duration_seconds double precision,
+    upload_date      text
+)
+language sql
+immutable
+as $$
+    select
+        m->>'youtube_id',
+        coalesce(nullif(m->>'title', ''), nullif(raw->>'title', '')),
+        coalesce(nullif(m->>'url', ''), nullif(raw->>'webpage_url', '')),
+        ch.channel,
+        coalesce(nullif(m->>'speaker', ''), nullif(raw->>'speaker', ''), nullif(raw->>'artist', '')),
+        coalesce(
+            case when jsonb_typeof(m->'duration_seconds') = 'number'
+                 then (m->>'duration_seconds')::double precision end,
+            case when jsonb_typeof(raw->'duration') = 'number'
+                 then (raw->>'duration')::double precision end
+        ),
+        coalesce(
+            nullif(m->>'upload_date', ''),
+            nullif(raw->>'upload_date', ''),
+            nullif(replace(m->>'published_at', '-', ''), '')
+        )
+    from (select coalesce(m->'raw_meta', '{}'::jsonb) as raw) r,
+    lateral (
+        select coalesce(
+            nullif(m->>'channel', ''),
+            nullif(raw->>'channel', ''),
+            nullif(raw->>'uploader', '')
+        ) as channel
+    ) ch
+$$;
+
+
+create or replace function public.sync_videos_from_documents()
+returns trigger
+language plpgsql
+as $$
+begin
+    insert into public.videos
+        (youtube_id, title, url, channel, speaker, duration_seconds, upload_date)
+    select v.*
+    from (
+        select distinct on (metadata->>'youtube_id') metadata
+        from new_rows
+        where metadata->>'youtube_id' is not null
+        order by metadata->>'youtube_id'
+    ) n,
+    lateral public.video_from_metadata(n.metadata) v
+    on conflict (youtube_id) do update set
+        title            = excluded.title,
+        url              = excluded.url,
+        channel          = excluded.channel,
+        speaker          = excluded.speaker,
+        duration_seconds = excluded.duration_seconds,
+        upload_date      = excluded.upload_date;
+    return null;
+end;
+$$;
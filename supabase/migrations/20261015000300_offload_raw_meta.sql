@@ -0,0 +1,74 @@
+-- Move the yt-dlp info dict (metadata.raw_meta) out of documents rows.
+--
+-- raw_meta is never sent to the LLM, yet every chunk row of a video
+-- carries its own copy, bloating the heap/TOAST of documents and every
+-- read that touches metadata. It now lives once per video in the
+-- private Storage bucket `raw_meta` as {youtube_id}.json, and rows keep
+-- only metadata.raw_meta_path.
+--
+-- Object contents can't be written from SQL, so the upload is done by
+-- `python offload_raw_meta.py`, which calls strip_offloaded_raw_meta()
+-- per video once its object exists. New ingestions upload directly.
+
+
+-- 1) Private bucket for the blobs
+insert into storage.buckets (id, name, public)
+values ('raw_meta', 'raw_meta', false)
+on conflict (id) do nothing;
+
+
+-- 2) Flatten every field the app reads from raw_meta into metadata, so
+--    nothing depends on the blob any more (same fallbacks as ingestion).
+update public.documents
+set metadata = metadata || jsonb_strip_nulls(jsonb_build_object(
+    'title', coalesce(nullif(metadata->>'title', ''), metadata->'raw_meta'->>'title'),
+    'url', coalesce(nullif(metadata->>'url', ''), metadata->'raw_meta'->>'webpage_url'),
+    'channel', coalesce(
+        nullif(metadata->>'channel', ''),
+        metadata->'raw_meta'->>'channel',
+        metadata->'raw_meta'->>'uploader'
+    ),
+    'speaker', coalesce(
+        nullif(metadata->>'speaker', ''),
+        metadata->'raw_meta'->>'speaker',
+        metadata->'raw_meta'->>'artist'
+    ),
+    'duration_seconds', coalesce(
+        case when jsonb_typeof(metadata->'duration_seconds') = 'number'
+             then metadata->'duration_seconds' end,
+        case when jsonb_typeof(metadata->'raw_meta'->'duration') = 'number'
+             then metadata->'raw_meta'->'duration' end
+    ),
+    'upload_date', coalesce(
+        nullif(metadata->>'upload_date', ''),
+        metadata->'raw_meta'->>'upload_date'
+    )
+))
+where metadata ? 'raw_meta';
+
+
+-- 3) Drop raw_meta from a video's rows once its Storage object exists
+create or replace function public.strip_offloaded_raw_meta(p_youtube_id text)
+returns integer
+language sql
+as $$
+    with stripped as (
+        update public.documents d
+        set metadata = (d.metadata - 'raw_meta')
+            || jsonb_build_object('raw_meta_path', 'raw_meta/' || p_youtube_id || '.json')
+        where d.metadata->>'youtube_id' = p_youtube_id
+          and d.metadata ? 'raw_meta'
+          and exists (
+              select 1
+              from storage.objects o
+              where o.bucket_id = 'raw_meta'
+                and o.name = p_youtube_id || '.json'
+          )
+        returning 1
+    )
+    select count(*)::integer from stripped
+$$;
+
+-- Rows whose blob was already uploaded (e.g. migration re-run)
+select public.strip_offloaded_raw_meta(v.youtube_id)
+from public.videos v;
@@ -0,0 +1,40 @@
+-- Filter match_documents by youtube_id inside the database.
+--
+-- The client used to over-fetch (match_count * 3) nearest chunks across
+-- all videos and drop the other videos' chunks in Python, which wasted
+-- rows on the wire and could return nothing for a video whose chunks
+-- weren't among the global top-K. With filter_youtube_id the predicate
+-- runs in the query (using idx_documents_youtube_id) and exactly
+-- match_count chunks of that video come back. Callers that don't pass it
+-- get the old global search.
+--
+-- The previous signature is dropped first so PostgREST doesn't see two
+-- overloads for the same named arguments.
+
+drop function if exists public.match_documents(vector, int);
+drop function if exists public.match_documents(vector, int, jsonb);
+
+create or replace function public.match_documents(
+    query_embedding vector(1536),
+    match_count int default 6,
+    filter_youtube_id text default null
+)
+returns table (
+    id uuid,
+    content text,
+    metadata jsonb,
+    similarity float
+)
+language sql stable
+as $$
+    select
+        d.id,
+        d.content,
+        d.metadata,
+        1 - (d.embedding <=> query_embedding) as similarity
+    from public.documents d
+    where filter_youtube_id is null
+       or d.metadata->>'youtube_id' = filter_youtube_id
+    order by d.embedding <=> query_embedding
+    limit match_count;
+$$;
@@ -0,0 +1,72 @@
+-- Video metadata lives only in videos; chunks keep just their youtube_id.
+--
+-- Until now every documents row carried a full copy of the video metadata
+-- and the sync_videos_from_documents trigger derived the videos row from
+-- it. Ingestion now upserts the videos row itself (one narrow row per
+-- video) and inserts chunks with metadata = {"youtube_id": ...}, so the
+-- per-chunk copies, the trigger and video_from_metadata() go away.
+-- Every chunk read (and every match_documents result) gets smaller.
+
+
+-- 1) The Storage reference moves to the videos row
+alter table public.videos add column if not exists raw_meta_path text;
+
+update public.videos v
+set raw_meta_path = d.raw_meta_path
+from (
+    select distinct on (metadata->>'youtube_id')
+        metadata->>'youtube_id' as youtube_id,
+        metadata->>'raw_meta_path' as raw_meta_path
+    from public.documents
+    where metadata->>'raw_meta_path' is not null
+    order by metadata->>'youtube_id', id
+) d
+where v.youtube_id = d.youtube_id
+  and v.raw_meta_path is null;
+
+
+-- 2) videos is written by the application from now on
+drop trigger if exists documents_sync_videos on public.documents;
+drop function if exists public.sync_videos_from_documents();
+drop function if exists public.video_from_metadata(jsonb);
+
+
+-- 3) Slim the chunk rows. raw_meta is kept on rows that still have it,
+--    so offload_raw_meta.py can upload it before it is stripped.
+update public.documents
+set metadata = jsonb_build_object('youtube_id', metadata->>'youtube_id')
+    || case when metadata ? 'raw_meta'
+            then jsonb_build_object('raw_meta', metadata->'raw_meta')
+            else '{}'::jsonb end
+where metadata - 'youtube_id' - 'raw_meta' <> '{}'::jsonb;
+
+
+-- 4) Offloading now records the path on the videos row
+create or replace function public.strip_offloaded_raw_meta(p_youtube_id text)
+returns integer
+language plpgsql
+as $$
+declare
+    stripped integer;
+begin
+    if not exists (
+        select 1
+        from storage.objects o
+        where o.bucket_id = 'raw_meta'
+          and o.name = p_youtube_id || '.json'
+    ) then
+        return 0;
+    end if;
+
+    update public.videos
+    set raw_meta_path = 'raw_meta/' || p_youtube_id || '.json'
+    where youtube_id = p_youtube_id;
+
+    update public.documents d
+    set metadata = d.metadata - 'raw_meta'
+    where d.metadata->>'youtube_id' = p_youtube_id
+      and d.metadata ? 'raw_meta';
+    get diagnostics stripped = row_count;
+    return stripped;
+end;
+$$;
@@ -0,0 +1,45 @@
+-- Store chunk embeddings as halfvec (float16) instead of vector (float32).
+--
+-- The embedding column dominates the size of a documents row: 1536 x 4
+-- bytes as vector, 1536 x 2 as halfvec (pgvector >= 0.7). Recall loss for
+-- text-embedding-3-small vectors at half precision is negligible, and
+-- distance computations on halfvec cost about the same.
+--
+-- The app now sends embeddings (on insert and as the match_documents
+-- query) as halfvec literals with float16-precision digits, so request
+-- bodies shrink as well. Any ANN index added later should use
+-- halfvec_cosine_ops to match the <=> ordering below.
+
+alter table public.documents
+    alter column embedding type halfvec(1536)
+    using embedding::halfvec(1536);
+
+-- Same function as before, with the query vector typed to match the
+-- column. The vector(1536) overload is dropped so PostgREST doesn't see
+-- two functions for the same named arguments.
+drop function if exists public.match_documents(vector, int, text);
+
+create or replace function public.match_documents(
+    query_embedding halfvec(1536),
+    match_count int default 6,
+    filter_youtube_id text default null
+)
+returns table (
+    id uuid,
+    content text,
+    metadata jsonb,
+    similarity float
+)
+language sql stable
+as $$
+    select
+        d.id,
+        d.content,
+        d.metadata,
+        1 - (d.embedding <=> query_embedding) as similarity
+    from public.documents d
+    where filter_youtube_id is null
+       or d.metadata->>'youtube_id' = filter_youtube_id
+    order by d.embedding <=> query_embedding
+    limit match_count;
+$$;
@@ -0,0 +1,10 @@
+# tests/conftest.py
+"""
+Make the repository root importable, so `pytest` works from any directory
+without installing the evrika package.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,38 @@
+# tests/test_agent_cache.py
+import pytest
+from cachetools import TTLCache
+
+from evrika import agent
+
+
+@pytest.fixture(autouse=True)
+def fresh_answer_cache(monkeypatch):
+    monkeypatch.setattr(agent, "_ANSWER_CACHE", TTLCache(maxsize=16, ttl=60))
+
+
+def _fail_embed(question):
+    raise AssertionError("embed_question should not be called")
+
+
+def test_semantic_cache_is_off_by_default(monkeypatch):
+    assert agent.AGENT_SEMANTIC_CACHE_ENABLED is False
+    monkeypatch.setattr(agent, "embed_question", _fail_embed)
+
+    answer, key, vector = agent._lookup_cached_answer("A question nobody asked yet")
+
+    assert answer is None and vector is None
+    agent._store_answer(key, vector, "An answer", set())
+    assert agent._lookup_cached_answer("a question  nobody asked yet")[0] == "An answer"
+
+
+def test_semantic_cache_when_enabled(monkeypatch):
+    monkeypatch.setattr(agent, "AGENT_SEMANTIC_CACHE_ENABLED", True)
+    monkeypatch.setattr(agent, "_SEMANTIC_CACHE", agent.SemanticCache())
+    monkeypatch.setattr(agent, "embed_question", lambda question: [1.0, 0.0, 0.5])
+
+    answer, key, vector = agent._lookup_cached_answer("Original wording")
+    assert answer is None and vector == [1.0, 0.0, 0.5]
+    agent._store_answer(key, vector, "Cached", set())
+
+    # Same vector, different text: only the semantic cache can match it
+    assert agent._lookup_cached_answer("Paraphrased wording")[0] == "Cached"
@@ -0,0 +1,25 @@
+# tests/test_audio_utils.py
+import pytest
+
+from evrika.audio_utils import _sniff_audio_format
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (b"RIFF\x24\x00\x00\x00WAVEfmt ", "wav"),
+        (b"\x1a\x45\xdf\xa3\x9f\x42\x86\x81", "webm"),
+        (b"OggS\x00\x02\x00\x00", "ogg"),
+        (b"fLaC\x00\x00\x00\x22", "flac"),
+        (b"ID3\x04\x00\x00\x00\x00", "mp3"),
+        (b"\xff\xfb\x90\x64", "mp3"),  # MPEG-1 Layer III frame
+        (b"\xff\xf3\x64\xc4", "mp3"),  # MPEG-2 Layer III frame
+        (b"\xff\xf1\x50\x80", "aac"),  # AAC ADTS (MPEG-4)
+        (b"\xff\xf9\x50\x80", "aac"),  # AAC ADTS (MPEG-2)
+        (b"\x00\x00\x00\x20ftypM4A ", "m4a"),
+        (b"hello world!", None),
+        (b"", None),
+    ],
+)
+def test_sniff_audio_format(header, expected):
+    assert _sniff_audio_format(header) == expected
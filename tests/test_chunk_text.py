@@ -0,0 +1,38 @@
+# tests/test_chunk_text.py
+from evrika.rag_pipeline import chunk_text
+
+
+def _words(n):
+    return [f"w{i}" for i in range(n)]
+
+
+def test_chunk_text_empty():
+    assert chunk_text("") == []
+    assert chunk_text("   \n\t ") == []
+
+
+def test_chunk_text_single_chunk_keeps_original_spacing():
+    text = "  alpha  beta\ngamma\tdelta  "
+    # One slice of the original text: inner whitespace is preserved
+    assert chunk_text(text, chunk_size=10, overlap=2) == ["alpha  beta\ngamma\tdelta"]
+
+
+def test_chunk_text_sizes_and_overlap():
+    words = _words(10)
+    chunks = chunk_text(" ".join(words), chunk_size=4, overlap=1)
+
+    # step = chunk_size - overlap = 3 -> chunks start at words 0, 3, 6, 9
+    assert chunks == [
+        " ".join(words[0:4]),
+        " ".join(words[3:7]),
+        " ".join(words[6:10]),
+        " ".join(words[9:10]),
+    ]
+    # consecutive chunks share `overlap` words
+    for first, second in zip(chunks, chunks[1:]):
+        assert first.split()[-1] == second.split()[0]
+
+
+def test_chunk_text_overlap_not_smaller_than_size_still_advances():
+    chunks = chunk_text(" ".join(_words(3)), chunk_size=2, overlap=5)
+    assert chunks == ["w0 w1", "w1 w2", "w2"]
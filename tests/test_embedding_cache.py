@@ -0,0 +1,51 @@
+# tests/test_embedding_cache.py
+import os
+
+import pytest
+
+from evrika import embedding_cache
+
+
+def _fake_embed(calls):
+    def embed(texts):
+        calls.append(list(texts))
+        return [[float(len(t)), 1.0] for t in texts]
+
+    return embed
+
+
+@pytest.fixture
+def cache_dir(monkeypatch):
+    def use(path):
+        monkeypatch.setattr(embedding_cache, "CACHE_DIR", path)
+        monkeypatch.setattr(
+            embedding_cache, "EMBEDDING_DB_PATH", os.path.join(path, "embeddings.sqlite3")
+        )
+        embedding_cache._get_db.cache_clear()
+
+    yield use
+    embedding_cache._get_db.cache_clear()
+
+
+def test_misses_are_deduplicated_and_stored(tmp_path, cache_dir):
+    cache_dir(str(tmp_path / "cache"))
+    calls = []
+
+    first = embedding_cache.get_or_compute(["a", "bb", "a"], _fake_embed(calls), "m")
+    second = embedding_cache.get_or_compute(["bb", "a"], _fake_embed(calls), "m")
+
+    assert first == [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0]]
+    assert second == [[2.0, 1.0], [1.0, 1.0]]
+    assert calls == [["a", "bb"]]
+
+
+def test_unusable_cache_dir_computes_everything(tmp_path, cache_dir):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    cache_dir(str(blocker / "cache"))
+    calls = []
+
+    vectors = embedding_cache.get_or_compute(["a", "bb"], _fake_embed(calls), "m")
+
+    assert vectors == [[1.0, 1.0], [2.0, 1.0]]
+    assert calls == [["a", "bb"]]
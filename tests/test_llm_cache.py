@@ -0,0 +1,51 @@
+# tests/test_llm_cache.py
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from evrika import llm_cache
+
+
+class _FakeLLM:
+    model_name = "fake-model"
+
+    def __init__(self):
+        self.calls = 0
+
+    def stream(self, prompt):
+        self.calls += 1
+        yield SimpleNamespace(content="hello ")
+        yield SimpleNamespace(content="world")
+
+
+@pytest.fixture
+def cache_dir(monkeypatch):
+    def use(path):
+        monkeypatch.setattr(llm_cache, "CACHE_DIR", path)
+        monkeypatch.setattr(llm_cache, "LLM_CACHE_DB_PATH", os.path.join(path, "llm.sqlite3"))
+        monkeypatch.setattr(llm_cache, "LLM_CACHE_ENABLED", True)
+        llm_cache._get_db.cache_clear()
+
+    yield use
+    llm_cache._get_db.cache_clear()
+
+
+def test_second_call_is_served_from_cache(tmp_path, cache_dir):
+    cache_dir(str(tmp_path / "cache"))
+    llm = _FakeLLM()
+
+    assert llm_cache.cached_invoke(llm, "prompt") == "hello world"
+    assert llm_cache.cached_invoke(llm, "prompt") == "hello world"
+    assert llm.calls == 1
+
+
+def test_unusable_cache_dir_calls_the_model(tmp_path, cache_dir):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    cache_dir(str(blocker / "cache"))
+    llm = _FakeLLM()
+
+    assert llm_cache.cached_invoke(llm, "prompt") == "hello world"
+    assert llm_cache.cached_invoke(llm, "prompt") == "hello world"
+    assert llm.calls == 2
@@ -0,0 +1,36 @@
+# tests/test_parallel_map.py
+import threading
+from contextvars import ContextVar
+
+from evrika.config import EXECUTOR, parallel_map
+
+_REQUEST: ContextVar[str] = ContextVar("request", default="none")
+
+
+def test_parallel_map_keeps_order():
+    assert parallel_map(lambda x, y: x * y, range(5), range(5)) == [0, 1, 4, 9, 16]
+
+
+def test_parallel_map_propagates_context():
+    _REQUEST.set("req-1")
+    assert parallel_map(lambda _: _REQUEST.get(), range(3)) == ["req-1"] * 3
+
+
+def test_nested_parallel_map_does_not_deadlock():
+    # More outer tasks than workers, each fanning out again: the inner
+    # tasks can only run because unstarted ones are run inline.
+    outer_count = EXECUTOR._max_workers * 2
+
+    def outer(i):
+        return sum(parallel_map(lambda j: i + j, range(4)))
+
+    result = {}
+    worker = threading.Thread(
+        target=lambda: result.update(value=parallel_map(outer, range(outer_count))),
+        daemon=True,
+    )
+    worker.start()
+    worker.join(timeout=30)
+
+    assert not worker.is_alive(), "nested parallel_map deadlocked"
+    assert result["value"] == [4 * i + 6 for i in range(outer_count)]
@@ -0,0 +1,78 @@
+# tests/test_request_scope.py
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from evrika.config import (
+    bind_chat_session,
+    bind_current_video,
+    get_chat_history,
+    get_current_youtube_id,
+    set_current_youtube_id,
+)
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+    app.middleware("http")(bind_current_video)
+    app.middleware("http")(bind_chat_session)
+
+    @app.post("/say/{text}")
+    def say(text: str):
+        history = get_chat_history()
+        history.append(text)
+        return {"history": list(history)}
+
+    @app.post("/stream")
+    def stream():
+        def body():
+            yield "a"
+            set_current_youtube_id("abcdefghijk")
+            yield get_current_youtube_id() or ""
+
+        return StreamingResponse(body(), media_type="text/plain")
+
+    return app
+
+
+def test_sessions_do_not_share_history():
+    client = TestClient(_app())
+
+    first = client.post("/say/one")
+    session = first.headers["X-Session-Id"]
+    assert first.json() == {"history": ["one"]}
+
+    other = client.post("/say/other")
+    assert other.headers["X-Session-Id"] != session
+    assert other.json() == {"history": ["other"]}
+
+    again = client.post("/say/two", headers={"X-Session-Id": session})
+    assert again.headers["X-Session-Id"] == session
+    assert again.json() == {"history": ["one", "two"]}
+
+
+def test_video_header_round_trip_and_streamed_update():
+    client = TestClient(_app())
+
+    resp = client.post("/say/x", headers={"X-Youtube-Id": "zzzzzzzzzzz"})
+    assert resp.headers["X-Youtube-Id"] == "zzzzzzzzzzz"
+
+    # The body can see (and update) the request's video while streaming
+    assert client.post("/stream").text == "aabcdefghijk"
+
+
+def test_chat_stream_reports_video_ingested_while_answering(monkeypatch):
+    import api
+
+    def fake_stream(message):
+        set_current_youtube_id("abcdefghijk")
+        yield "Hello"
+
+    monkeypatch.setattr(api, "agent_respond_stream", fake_stream)
+    resp = TestClient(api.app).post("/chat/stream", json={"message": "hi"})
+
+    assert resp.text == (
+        "data: Hello\n\n"
+        "event: video\ndata: abcdefghijk\n\n"
+        "event: done\ndata: \n\n"
+    )
@@ -0,0 +1,29 @@
+# tests/test_sanitize_tool_output.py
+import orjson
+
+from evrika.agent import MAX_TOOL_OUTPUT_CHARS, _sanitize_tool_output
+
+
+def test_small_outputs_pass_through():
+    assert _sanitize_tool_output("t", "hello") == "hello"
+    assert _sanitize_tool_output("t", 42) == "42"
+
+
+def test_dicts_are_serialized_as_compact_json():
+    out = _sanitize_tool_output("video_metadata", {"id": "abc", "dur": 60})
+    assert out == '{"id":"abc","dur":60}'
+
+
+def test_large_raw_meta_is_omitted():
+    out = _sanitize_tool_output(
+        "t", {"title": "T", "raw_meta": "x" * (MAX_TOOL_OUTPUT_CHARS + 1)}
+    )
+    assert orjson.loads(out) == {
+        "title": "T",
+        "raw_meta": "[omitted: raw_meta too large]",
+    }
+
+
+def test_large_plain_text_is_truncated():
+    out = _sanitize_tool_output("t", "y" * (MAX_TOOL_OUTPUT_CHARS + 100))
+    assert out == "y" * MAX_TOOL_OUTPUT_CHARS + "... [truncated]"
@@ -0,0 +1,23 @@
+# tests/test_save_brief_tool.py
+import os
+import tempfile
+
+from evrika.agent import TOOLS_BY_NAME
+
+
+def test_pdf_tool_only_takes_the_brief_text(tmp_path):
+    pdf_tool = TOOLS_BY_NAME["save_brief_as_pdf"]
+    assert set(pdf_tool.args) == {"brief_text"}
+
+    target = tmp_path / "chosen.pdf"
+    path = pdf_tool.invoke({"brief_text": "# Brief\n\nBody", "filename": str(target)})
+    try:
+        assert not target.exists()
+        assert os.path.dirname(path) == tempfile.gettempdir()
+        with open(path, "rb") as f:
+            assert f.read(5) == b"%PDF-"
+        other = pdf_tool.invoke({"brief_text": "# Brief"})
+        assert other != path
+        os.remove(other)
+    finally:
+        os.remove(path)
@@ -0,0 +1,55 @@
+# tests/test_semantic_cache.py
+import numpy as np
+
+from evrika.semantic_cache import SemanticCache
+
+DIM = 64
+
+
+def _vector(seed):
+    return np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+
+
+def test_lookup_empty_cache():
+    assert SemanticCache().lookup(_vector(0)) is None
+
+
+def test_exact_and_near_duplicate_hit():
+    cache = SemanticCache()
+    v = _vector(1)
+    cache.add(v, "answer", scope="vid")
+
+    assert cache.lookup(v, scope="vid") == "answer"
+    # Scaling doesn't change the direction
+    assert cache.lookup(v * 3.0, scope="vid") == "answer"
+    # A tiny perturbation stays well above the similarity threshold
+    assert cache.lookup(v + 1e-4 * _vector(2), scope="vid") == "answer"
+
+
+def test_scope_and_dissimilar_vectors_miss():
+    cache = SemanticCache()
+    v = _vector(3)
+    cache.add(v, "answer", scope="vid-a")
+
+    assert cache.lookup(v, scope="vid-b") is None
+    assert cache.lookup(-v, scope="vid-a") is None
+    assert cache.lookup(_vector(4), scope="vid-a") is None
+
+
+def test_oldest_entry_is_evicted():
+    cache = SemanticCache(max_entries=2)
+    vectors = [_vector(10 + i) for i in range(3)]
+    for i, v in enumerate(vectors):
+        cache.add(v, f"answer-{i}")
+
+    assert cache.lookup(vectors[0]) is None
+    assert cache.lookup(vectors[1]) == "answer-1"
+    assert cache.lookup(vectors[2]) == "answer-2"
+
+
+def test_clear():
+    cache = SemanticCache()
+    v = _vector(5)
+    cache.add(v, "answer")
+    cache.clear()
+    assert cache.lookup(v) is None
@@ -0,0 +1,32 @@
+# tests/test_supabase_store.py
+from uuid import UUID
+
+import numpy as np
+
+from evrika.supabase_store import (
+    document_id,
+    halfvec_literal,
+)
+
+
+def test_halfvec_literal_rounds_to_float16():
+    values = [0.5, -0.25, 1.0, 0.1, 1e-3]
+    literal = halfvec_literal(values)
+
+    assert literal.startswith("[") and literal.endswith("]")
+    tokens = literal[1:-1].split(",")
+    assert len(tokens) == len(values)
+    for token, value in zip(tokens, values):
+        assert np.float16(float(token)) == np.float16(value)
+    assert tokens[:3] == ["0.5", "-0.25", "1.0"]
+
+
+def test_document_id_is_stable_and_scoped_to_video():
+    content = "Some transcript chunk."
+    a = document_id(content, {"youtube_id": "aaaaaaaaaaa"})
+
+    assert a == document_id(content, {"youtube_id": "aaaaaaaaaaa"})
+    assert UUID(a).version == 5
+    assert a != document_id(content, {"youtube_id": "bbbbbbbbbbb"})
+    assert a != document_id(content + " ", {"youtube_id": "aaaaaaaaaaa"})
+
@@ -0,0 +1,22 @@
+# tests/test_video_fields.py
+from evrika.rag_pipeline import _build_metadata_view, _video_fields
+
+
+def test_speaker_comes_from_speaker_or_artist():
+    raw_meta = {"channel": "Label VEVO", "uploader": "Label VEVO", "artist": "Some Artist"}
+    fields = _video_fields("abcdefghijk", "Song", "https://youtu.be/abcdefghijk", raw_meta)
+
+    assert fields["channel"] == "Label VEVO"
+    assert fields["speaker"] == "Some Artist"
+    assert _build_metadata_view("abcdefghijk", fields)["speaker"] == "Some Artist"
+
+    raw_meta["speaker"] = "Host"
+    assert _video_fields("abcdefghijk", "", "", raw_meta)["speaker"] == "Host"
+
+
+def test_speaker_is_not_the_uploader():
+    raw_meta = {"channel": "Talks", "uploader": "Talks", "upload_date": "20240131"}
+    fields = _video_fields("abcdefghijk", "", "", raw_meta)
+
+    assert fields["speaker"] is None
+    assert fields["published_at"] == "2024-01-31"
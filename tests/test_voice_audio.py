@@ -0,0 +1,24 @@
+# tests/test_voice_audio.py
+from cachetools import TTLCache
+from fastapi.testclient import TestClient
+
+from evrika import voice_api
+
+
+def test_voice_audio_store_is_bounded_by_bytes(monkeypatch):
+    store = TTLCache(maxsize=10, ttl=60, getsizeof=lambda stored: len(stored[0]))
+    monkeypatch.setattr(voice_api, "_VOICE_AUDIO", store)
+
+    first = voice_api._keep_voice_audio(b"123456", "audio/mpeg")
+    second = voice_api._keep_voice_audio(b"abcdef", "audio/mpeg")
+
+    # Both don't fit in 10 bytes: the older one is evicted
+    assert first not in store and second in store
+    # Larger than the whole store: not kept at all
+    assert voice_api._keep_voice_audio(b"x" * 11, "audio/mpeg") is None
+
+    client = TestClient(voice_api.app)
+    resp = client.get(f"/voice-query/audio/{second}")
+    assert resp.content == b"abcdef"
+    assert resp.headers["content-type"] == "audio/mpeg"
+    assert client.get(f"/voice-query/audio/{first}").status_code == 404
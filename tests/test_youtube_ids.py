@@ -0,0 +1,30 @@
+# tests/test_youtube_ids.py
+import pytest
+
+from evrika.youtube_ids import extract_youtube_id
+
+VIDEO_ID = "dQw4w9WgXcQ"
+
+
+@pytest.mark.parametrize(
+    "hint",
+    [
+        VIDEO_ID,
+        f"https://www.youtube.com/watch?v={VIDEO_ID}",
+        f"https://www.youtube.com/watch?v={VIDEO_ID}&t=42s",
+        f"https://www.youtube.com/watch?feature=share&v={VIDEO_ID}",
+        f"https://m.youtube.com/watch?v={VIDEO_ID}",
+        f"https://youtu.be/{VIDEO_ID}",
+        f"https://youtu.be/{VIDEO_ID}?si=abc123",
+        f"https://www.youtube.com/shorts/{VIDEO_ID}",
+        f"https://www.youtube.com/embed/{VIDEO_ID}",
+        f"https://www.youtube.com/live/{VIDEO_ID}?feature=share",
+    ],
+)
+def test_extract_youtube_id_common_shapes(hint):
+    assert extract_youtube_id(hint) == VIDEO_ID
+
+
+def test_extract_youtube_id_empty_raises():
+    with pytest.raises(ValueError):
+        extract_youtube_id("")